@@ -0,0 +1,232 @@
+#!/usr/bin/python
+##-------------------------------##
+## Assembly Line: Benchmarks     ##
+## Written By: Ryan Smith        ##
+##-------------------------------##
+
+## Imports
+from __future__ import annotations
+import argparse
+import gc
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any
+
+import calculator
+from editor.chunk import ArrayChunk, Chunk
+from editor.floor import Floor
+from editor.manager import load_floor
+from editor.simulator import FloorSimulation
+
+## Constants
+FLOOR_SIZES: tuple[int, ...] = (1, 10, 25, 50, 100)
+SIMULATION_TICKS: int = 1000
+ENTITY_FILES: tuple[str, ...] = (
+    "starters.json", "importers.json", "rollers.json", "sellers.json",
+    "transporter_inputs.json", "transporter_outputs.json", "splitters.json",
+    "transformers.json", "quantity_transformers.json",
+    "crafters.json", "radioactive_crafters.json",
+)
+EMPTY_FILES: tuple[str, ...] = ("selectors.json",)
+
+
+## Functions
+def measure(name: str, func: Callable[[], Any], setup: Callable[[], Any] | None = None, repeat: int = 5) -> dict[str, Any]:
+    """
+    Times a function over several runs and captures its peak memory in one extra traced run
+        setup runs before every call and is excluded from both measurements
+    """
+    timings: list[float] = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    if setup is not None:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'name': name,
+        'repeat': repeat,
+        'min': min(timings),
+        'mean': sum(timings) / len(timings),
+        'max': max(timings),
+        'peak_bytes': peak,
+    }
+
+
+def generate_floor(path: Path, chunk_count: int) -> Path:
+    """
+    Writes a synthetic floor save with chunk_count fully populated chunks
+        Entity kinds are cycled tile by tile across every per-kind save file
+    """
+    if not 1 <= chunk_count <= Floor.Size * Floor.Size:
+        raise ValueError(f"Chunk count '{chunk_count}' not valid")
+    path.mkdir(parents=True, exist_ok=True)
+    spaces = [[0 for x in range(Floor.Size)] for y in range(Floor.Size)]
+    entities: dict[str, list[dict[str, Any]]] = {file: [] for file in ENTITY_FILES}
+    tile = 0
+    for index in range(chunk_count):
+        chunk_x, chunk_y = (index % Floor.Size, index // Floor.Size)
+        spaces[chunk_y][chunk_x] = 1
+        for x in range(Chunk.Size):
+            for y in range(Chunk.Size):
+                file = ENTITY_FILES[tile % len(ENTITY_FILES)]
+                entities[file].append(_generate_entity(
+                    file, tile,
+                    chunk_x * Chunk.Size + x, chunk_y * Chunk.Size + y,
+                ))
+                tile += 1
+    with open(path / "spaces.json", 'w') as f:
+        json.dump(spaces, f)
+    for file, data in entities.items():
+        with open(path / file, 'w') as f:
+            json.dump(data, f)
+    for file in EMPTY_FILES:
+        with open(path / file, 'w') as f:
+            json.dump([], f)
+    return path
+
+
+def _generate_entity(file: str, tile: int, x: int, y: int) -> dict[str, Any]:
+    """Builds one save-file entity record of the kind stored in file"""
+    entity: dict[str, Any] = {
+        'Type': ENTITY_FILES.index(file),
+        'Direction': tile % 4,
+        'Position': [float(x), float(y)],
+    }
+    resource = tile % 20
+    if file == "starters.json":
+        entity['ResourceType'] = resource
+    elif file == "importers.json":
+        entity['Resource'] = resource
+        entity['SelectedTime'] = 1.0
+    elif file in ("transporter_inputs.json", "transporter_outputs.json"):
+        entity['TransporterLineId'] = tile % 8
+    elif file in ("transformers.json", "quantity_transformers.json"):
+        entity['Queue'] = {'Resources': [{'ResourceType': resource}] * 3}
+    elif file in ("crafters.json", "radioactive_crafters.json"):
+        entity['BlueprintResult'] = resource
+        entity['Inventory'] = {'Resources': [
+            {'ResourceType': resource, 'Quantity': 2},
+            {'ResourceType': (resource + 1) % 20, 'Quantity': 1},
+        ]}
+        if file == "radioactive_crafters.json":
+            entity['Energy'] = 100.0
+    return entity
+
+
+def benchmark_calculator(repeat: int) -> Iterable[dict[str, Any]]:
+    """Benchmarks solving, recipe registration and DOT emission"""
+    recipes = dict(calculator.RECIPES.recipes)
+    items = list(recipes)
+    items = items[items.index('battery'):]
+    # -Solves
+    def _solve() -> None:
+        '''
+        '''
+        for item in items:
+            calculator.get_starter_count(calculator.get_machine_count(item, 1.5))
+    yield measure("calculator.solve[cold]", _solve, calculator.SOLVE_CACHE.clear, repeat)
+    yield measure("calculator.solve[warm]", _solve, None, repeat)
+    def _totals() -> None:
+        '''
+        '''
+        for item in items:
+            calculator.get_machine_totals(item, 1.5)
+    yield measure("calculator.get_machine_totals[cold]", _totals, calculator.SOLVE_CACHE.clear, repeat)
+    # -Recipe Registration
+    def _register() -> None:
+        '''
+        '''
+        book = calculator.RECIPES
+        calculator.RECIPES = calculator.RecipeBook()
+        try:
+            for output, recipe in recipes.items():
+                calculator.RECIPES[output] = recipe
+        finally:
+            calculator.RECIPES = book
+    yield measure("calculator.add_recipe[pack]", _register, None, repeat)
+    # -Graph Emission
+    for merged in (False, True):
+        def _write_dot() -> None:
+            '''
+            '''
+            calculator.write_machine_dot(calculator.get_machine_count('bomber', 1.0), io.StringIO(), merged)
+        yield measure(f"calculator.write_machine_dot[bomber, merged={merged}]", _write_dot, None, repeat)
+
+
+def benchmark_editor(repeat: int, sizes: Iterable[int]) -> Iterable[dict[str, Any]]:
+    """Benchmarks load_floor and the floor simulator on synthetic saves of increasing size"""
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = generate_floor(Path(directory) / f"floor_{size}", size)
+            for chunk_type in (Chunk, ArrayChunk):
+                result = measure(
+                    f"editor.load_floor[{size} chunks, {chunk_type.__name__}]",
+                    lambda: load_floor(path, chunk_type), None, repeat,
+                )
+                result['chunks'] = size
+                result['entities'] = size * Chunk.Size * Chunk.Size
+                yield result
+            floor = load_floor(path)
+            result = measure(
+                f"editor.simulator[{size} chunks, {SIMULATION_TICKS} ticks]",
+                lambda: FloorSimulation(floor).run(SIMULATION_TICKS), None, repeat,
+            )
+            result['chunks'] = size
+            result['entities'] = size * Chunk.Size * Chunk.Size
+            yield result
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Runs every benchmark, prints a summary and optionally writes json results"""
+    parser = argparse.ArgumentParser(description="Assembly Line calculator/editor benchmarks")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument('--sizes', type=lambda v: [int(i) for i in v.split(',')], default=FLOOR_SIZES,
+                        help="comma separated floor chunk counts")
+    parser.add_argument('--json', type=Path, default=None, help="write machine-readable results to this file")
+    parser.add_argument('--only', choices=('calculator', 'editor'), default=None)
+    args = parser.parse_args(argv)
+    results: list[dict[str, Any]] = []
+    suites = []
+    if args.only in (None, 'calculator'):
+        suites.append(benchmark_calculator(args.repeat))
+    if args.only in (None, 'editor'):
+        suites.append(benchmark_editor(args.repeat, args.sizes))
+    for suite in suites:
+        for result in suite:
+            results.append(result)
+            print(
+                f"{result['name']:<52} min {result['min'] * 1e3:10.3f}ms "
+                f"mean {result['mean'] * 1e3:10.3f}ms peak {result['peak_bytes'] / 1024:10.1f}KiB"
+            )
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'time': time.time(),
+                'results': results,
+            }, f, indent=2)
+    return 0
+
+
+## Body
+if __name__ == '__main__':
+    sys.exit(main())
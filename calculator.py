@@ -5,9 +5,17 @@
 ##-------------------------------##
 
 ## Imports
+from __future__ import annotations
+import hashlib
+import json
 import math
-from typing import Any
+import pickle
+import sys
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator, Mapping, MutableMapping
+from typing import Any, TextIO
 from pathlib import Path
+from instrumentation import STATS, instrumented
 
 ## Constants
 MACHINES: dict[str, float] = {
@@ -25,207 +33,1354 @@ MACHINES: dict[str, float] = {
     'crafter5': 1.0,
     'refinery': 1.0,
 }
-RECIPES: dict[str, Any] = {}
+RECIPES_PATH: Path = Path(__file__).parent / "data" / "recipes.2.json"
+RESOURCES_PATH: Path = Path(__file__).parent / "data" / "resources.2.json"
+UPGRADES_PATH: Path = Path(__file__).parent / "data" / "machines.2.json"
+
+
+## Classes
+class RecipeBook(MutableMapping):
+    """
+    Assembly Line 2 Recipe Book
+        Lazily loaded from a recipe json file (or its pickled cache) on first use
+    """
+
+    # -Constructor
+    def __init__(self, path: Path | None = None, cache_path: Path | None = None) -> None:
+        self.path: Path | None = path
+        if cache_path is None and path is not None:
+            cache_path = path.with_suffix('.pickle')
+        self.cache_path: Path | None = cache_path
+        self.version: int = 0
+        self.derived: dict[str, Any] = {}
+        self._recipes: dict[str, Any] | None = None
+        self._ranks: dict[str, int] | None = None
+        self._consumers: dict[str, set[str]] | None = None
+        self._closure: dict[str, dict[str, float]] | None = None
+
+    # -Dunder Methods
+    def __getitem__(self, item: str) -> dict[str, Any]:
+        return self.recipes[item]
+
+    def __setitem__(self, item: str, recipe: dict[str, Any]) -> None:
+        self.register(item, recipe)
+
+    def __delitem__(self, item: str) -> None:
+        for output, recipe in self.recipes.items():
+            if item in recipe.get('inputs', ()):
+                raise ValueError(f"Item '{item}' is still used by '{output}'")
+        recipe = self.recipes.pop(item)
+        del self.ranks[item]
+        if self._consumers is not None:
+            for input_item in recipe.get('inputs', ()):
+                self._consumers[input_item].discard(item)
+            del self._consumers[item]
+            del self._closure[item]
+        self.changed()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.recipes)
+
+    def __len__(self) -> int:
+        return len(self.recipes)
+
+    def __contains__(self, item: object) -> bool:
+        return item in self.recipes
+
+    def __repr__(self) -> str:
+        if self._recipes is None:
+            return f"RecipeBook(path={self.path}, loaded=False)"
+        return f"RecipeBook(path={self.path}, recipes={len(self._recipes)})"
+
+    # -Instance Methods
+    def register(self, output: str, recipe: dict[str, Any]) -> None:
+        '''
+        Validates and adds a single recipe
+            New items only look at their direct inputs, redefined items are also checked for cycles
+        '''
+        global MACHINES
+        recipes = self.recipes
+        ranks = self.ranks
+        machine = recipe['machine']
+        if machine not in MACHINES:
+            raise KeyError(f"Machine '{machine}' not valid")
+        if recipe.get('output', 1) <= 0 or recipe.get('time', 1) <= 0:
+            raise ValueError(f"Output/time of '{output}' not valid")
+        inputs = recipe.get('inputs', {})
+        rank = 0
+        for item in inputs:
+            if item == output:
+                raise ValueError(f"Recipe '{output}' uses itself as an input")
+            item_rank = ranks.get(item)
+            if item_rank is None:
+                raise KeyError(f"Item '{item}' not valid")
+            rank = max(rank, item_rank + 1)
+        # -Redefined: consumers of output may now be inputs of it
+        redefined = output in recipes
+        if redefined:
+            item = self._find_consumer(output, inputs)
+            if item is not None:
+                raise ValueError(f"Recipe '{output}' forms a cycle through '{item}'")
+            new_ranks = self._get_downstream_ranks(output, rank)
+        else:
+            new_ranks = {output: rank}
+        # -Validated: nothing below can fail halfway
+        previous = recipes.get(output)
+        recipes[output] = recipe
+        ranks.update(new_ranks)
+        if self._consumers is not None:
+            self._update_indexes(output, previous)
+        self.changed()
+
+    def register_many(self, recipes: Mapping[str, dict[str, Any]]) -> list[str]:
+        '''
+        Validates and adds a recipe pack in linear time
+            Recipes may reference each other in any order
+        '''
+        order: list[str] = []
+        state: dict[str, bool] = {}  # -False=visiting, True=done
+        for root in recipes:
+            if root in state:
+                continue
+            state[root] = False
+            stack = [(root, iter(recipes[root].get('inputs', ())))]
+            while stack:
+                output, inputs = stack[-1]
+                for item in inputs:
+                    if item not in recipes:
+                        continue
+                    item_state = state.get(item)
+                    if item_state is None:
+                        state[item] = False
+                        stack.append((item, iter(recipes[item].get('inputs', ()))))
+                        break
+                    elif not item_state:
+                        raise ValueError(f"Recipe '{output}' forms a cycle through '{item}'")
+                else:
+                    stack.pop()
+                    state[output] = True
+                    order.append(output)
+        for output in order:
+            self.register(output, recipes[output])
+        return order
+
+    def _get_downstream_ranks(self, output: str, rank: int) -> dict[str, int]:
+        '''
+        Gets the ranks of output and every item that (transitively) uses it once output has rank
+            Edges between the dependents don't change, so their old ranks are still a valid order
+        '''
+        recipes = self.recipes
+        ranks = self.ranks
+        new_ranks = {output: rank}
+        for item in sorted(self.dependents(output), key=ranks.__getitem__):
+            new_ranks[item] = 1 + max(
+                new_ranks.get(input_item, ranks[input_item])
+                for input_item in recipes[item]['inputs']
+            )
+        return new_ranks
+
+    def _find_consumer(self, output: str, inputs: Iterable[str]) -> str | None:
+        '''Finds an item in inputs that (transitively) consumes output'''
+        recipes = self.recipes
+        ranks = self.ranks
+        # -Only items ranked above output can consume it
+        floor_rank = ranks[output]
+        for root in inputs:
+            stack = [root]
+            visited = {root}
+            while stack:
+                item = stack.pop()
+                if item == output:
+                    return root
+                if ranks[item] <= floor_rank:
+                    continue
+                for input_item in recipes[item].get('inputs', ()):
+                    if input_item not in visited:
+                        visited.add(input_item)
+                        stack.append(input_item)
+        return None
+
+    def consumers(self, item: str) -> set[str]:
+        '''Gets the items whose recipes use item directly'''
+        if self._consumers is None:
+            self._build_indexes()
+        return self._consumers[item]
+
+    def dependents(self, item: str) -> set[str]:
+        '''Gets every item that (transitively) uses item'''
+        consumers = self._consumers if self._consumers is not None else self._build_indexes()
+        found: set[str] = set()
+        stack = [item]
+        while stack:
+            for consumer in consumers[stack.pop()]:
+                if consumer not in found:
+                    found.add(consumer)
+                    stack.append(consumer)
+        return found
+
+    def requirements(self, item: str) -> dict[str, float]:
+        '''Gets how much of every upstream item one unit of item needs (transitively)'''
+        if self._closure is None:
+            self._build_indexes()
+        return self._closure[item]
+
+    def _build_indexes(self) -> dict[str, set[str]]:
+        '''Builds the reverse-dependency index and transitive closure in rank order'''
+        recipes = self.recipes
+        self._consumers = {item: set() for item in recipes}
+        self._closure = {}
+        for item in sorted(recipes, key=self.ranks.__getitem__):
+            for input_item in recipes[item].get('inputs', ()):
+                self._consumers[input_item].add(item)
+            self._closure[item] = self._get_closure(item)
+        return self._consumers
+
+    def _get_closure(self, item: str) -> dict[str, float]:
+        '''
+        '''
+        closure: dict[str, float] = {}
+        recipe = self.recipes[item]
+        for input_item, quantity in recipe.get('inputs', {}).items():
+            quantity /= recipe.get('output', 1)
+            closure[input_item] = closure.get(input_item, 0.0) + quantity
+            for upstream, amount in self._closure[input_item].items():
+                closure[upstream] = closure.get(upstream, 0.0) + quantity * amount
+        return closure
+
+    def _update_indexes(self, output: str, previous: dict[str, Any] | None) -> None:
+        '''Keeps the indexes current after output was registered (new items touch nothing else)'''
+        consumers = self._consumers
+        consumers.setdefault(output, set())
+        if previous is not None:
+            for input_item in previous.get('inputs', ()):
+                consumers[input_item].discard(output)
+        for input_item in self.recipes[output].get('inputs', ()):
+            consumers[input_item].add(output)
+        if previous is None:
+            self._closure[output] = self._get_closure(output)
+            return
+        ranks = self.ranks
+        for item in sorted(self.dependents(output) | {output}, key=ranks.__getitem__):
+            self._closure[item] = self._get_closure(item)
+
+    def changed(self) -> None:
+        '''Marks the book as changed and drops everything derived from it'''
+        self.version += 1
+        self.derived.clear()
+
+    def load(self) -> dict[str, Any]:
+        '''Loads recipes from the cache when it matches the json file, else parses and validates the json'''
+        if self.path is None:
+            return {}
+        stat = self.path.stat()
+        cache = self._read_cache()
+        if cache is not None and cache['mtime'] == stat.st_mtime_ns and cache['size'] == stat.st_size:
+            return cache['recipes']
+        raw = self.path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        if cache is not None and cache['hash'] == digest:
+            recipes = cache['recipes']
+        else:
+            recipes = json.loads(raw)
+        self._write_cache({
+            'mtime': stat.st_mtime_ns, 'size': stat.st_size,
+            'hash': digest, 'recipes': recipes,
+        })
+        return recipes
+
+    def _load_validated(self) -> None:
+        '''
+        '''
+        recipes = self.load()
+        self._ranks = RecipeBook.validate(recipes)
+        self._recipes = recipes
+        self._consumers = None
+        self._closure = None
+
+    def _read_cache(self) -> dict[str, Any] | None:
+        '''
+        '''
+        if self.cache_path is None:
+            return None
+        try:
+            with open(self.cache_path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _write_cache(self, cache: dict[str, Any]) -> None:
+        '''
+        '''
+        if self.cache_path is None:
+            return
+        try:
+            with open(self.cache_path, 'wb') as f:
+                pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            pass
+
+    # -Static Methods
+    @staticmethod
+    def validate(recipes: dict[str, Any]) -> dict[str, int]:
+        '''
+        Validates recipes in one pass and gets their ranks (0=starter, else 1 + highest input rank)
+            Every machine must exist and every input must be defined before the recipe using it
+        '''
+        global MACHINES
+        ranks: dict[str, int] = {}
+        for output, recipe in recipes.items():
+            if recipe['machine'] not in MACHINES:
+                raise KeyError(f"Machine '{recipe['machine']}' not valid for '{output}'")
+            if recipe.get('output', 1) <= 0 or recipe.get('time', 1) <= 0:
+                raise ValueError(f"Output/time of '{output}' not valid")
+            rank = 0
+            for item in recipe.get('inputs', ()):
+                item_rank = ranks.get(item)
+                if item_rank is None:
+                    raise KeyError(f"Item '{item}' not valid for '{output}'")
+                rank = max(rank, item_rank + 1)
+            ranks[output] = rank
+        return ranks
+
+    # -Properties
+    @property
+    def fingerprint(self) -> str:
+        '''Hash of the recipe set (and machine factors/speeds), stable across processes'''
+        global MACHINES
+        fingerprint = self.derived.get('fingerprint')
+        if fingerprint is None:
+            raw = json.dumps([self.recipes, MACHINES, get_machine_speeds()], sort_keys=True).encode()
+            fingerprint = self.derived['fingerprint'] = hashlib.sha256(raw).hexdigest()
+        return fingerprint
+
+    @property
+    def loaded(self) -> bool:
+        return self._recipes is not None
+
+    @property
+    def ranks(self) -> dict[str, int]:
+        if self._ranks is None:
+            self._load_validated()
+        return self._ranks
+
+    @property
+    def recipes(self) -> dict[str, Any]:
+        if self._recipes is None:
+            self._load_validated()
+        return self._recipes
+
+
+class CompiledRecipes:
+    """
+    Compiled matrix form of RECIPES
+        inputs: sparse (CSR) input coefficients, inputs[i, j] = amount of j per craft of i
+        demand: transitive rate of every item needed per unit of each item
+        starters: starter machines needed per unit of each item
+    """
+
+    # -Constructor
+    def __init__(self) -> None:
+        import numpy
+        global MACHINES, RECIPES
+        self.items: list[str] = get_recipe_order()
+        self.index: dict[str, int] = {item: i for i, item in enumerate(self.items)}
+        size = len(self.items)
+        self.machines: list[str] = [RECIPES[item]['machine'] for item in self.items]
+        factors = [get_item_factors(item) for item in self.items]
+        self.factors = numpy.array([machines for machines, _ in factors], dtype=float)
+        self.crafts = numpy.array([crafts for _, crafts in factors], dtype=float)
+        self.is_starter = numpy.array(['inputs' not in RECIPES[item] for item in self.items], dtype=bool)
+        # -Sparse Inputs
+        indptr = [0]
+        indices: list[int] = []
+        data: list[float] = []
+        for item in self.items:
+            for input_item, input_count in RECIPES[item].get('inputs', {}).items():
+                indices.append(self.index[input_item])
+                data.append(input_count)
+            indptr.append(len(indices))
+        self.input_indptr = numpy.array(indptr, dtype=numpy.intp)
+        self.input_indices = numpy.array(indices, dtype=numpy.intp)
+        self.input_data = numpy.array(data, dtype=float)
+        # -Transitive Demand: inputs precede outputs, so each row only needs finished rows
+        self.demand = numpy.zeros((size, size), dtype=float)
+        for i in range(size):
+            row = self.demand[i]
+            row[i] = 1.0
+            start, end = self.input_indptr[i], self.input_indptr[i + 1]
+            for j, input_count in zip(self.input_indices[start:end], self.input_data[start:end]):
+                row += (input_count * self.crafts[i]) * self.demand[j]
+        self.starters = self.demand[:, self.is_starter] @ self.factors[self.is_starter]
+
+    # -Instance Methods
+    def demand_vector(self, targets: Mapping[str, Any]) -> Any:
+        '''Builds a (batch, items) demand matrix from item -> rate(s)'''
+        import numpy
+        rates = {item: numpy.atleast_1d(numpy.asarray(rate, dtype=float)) for item, rate in targets.items()}
+        batch = max((len(rate) for rate in rates.values()), default=1)
+        vector = numpy.zeros((batch, len(self.items)), dtype=float)
+        for item, rate in rates.items():
+            vector[:, self.index[item]] += rate
+        return vector
+
+    def solve_batch(self, targets: Mapping[str, Any] | Any) -> dict[str, Any]:
+        '''
+        Solves a batch of demand vectors in one vectorized step
+            targets: item -> rate (or sequence of rates), or a (batch, items) array
+        '''
+        import numpy
+        if isinstance(targets, Mapping):
+            vector = self.demand_vector(targets)
+        else:
+            vector = numpy.atleast_2d(numpy.asarray(targets, dtype=float))
+        rates = vector @ self.demand
+        machines = rates * self.factors
+        return {
+            'rates': rates,
+            'machines': machines,
+            'starters': machines[:, self.is_starter].sum(axis=1),
+        }
+
+class SolveCache:
+    """
+    Bounded LRU cache of per-unit solves keyed on (recipe fingerprint, item)
+        Demand is linear in rate, so a per-unit entry answers every rate of that item
+        path: optional directory of pickled entries shared between processes
+    """
+
+    # -Constructor
+    def __init__(self, size: int = 256, path: Path | None = None) -> None:
+        self.size: int = size
+        self.path: Path | None = path
+        self.hits: int = 0
+        self.disk_hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[tuple[str, str], dict[str, Any]] = OrderedDict()
+
+    # -Dunder Methods
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"SolveCache(size={self.size}, entries={len(self._entries)}, hits={self.hits}, misses={self.misses})"
+
+    # -Instance Methods
+    def get(self, item: str) -> dict[str, Any]:
+        '''Gets the per-unit 'totals' and 'starters' of an item'''
+        global RECIPES
+        if item not in RECIPES:
+            raise KeyError(f"Item '{item}' not valid")
+        key = (RECIPES.fingerprint, item)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+        entry = self._read(key)
+        if entry is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            totals = _solve_machine_totals(item, 1.0)
+            entry = {
+                'totals': totals,
+                'starters': sum(
+                    total['count'] for output, total in totals.items()
+                    if 'inputs' not in RECIPES[output]
+                ),
+            }
+            self._write(key, entry)
+        self._entries[key] = entry
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        '''Drops every in-memory entry and resets the counters'''
+        self._entries.clear()
+        self.hits = self.disk_hits = self.misses = 0
+
+    def _entry_path(self, key: tuple[str, str]) -> Path:
+        '''
+        '''
+        name = hashlib.sha256('\0'.join(key).encode()).hexdigest()[:32]
+        return self.path / f"{name}.pickle"
+
+    def _read(self, key: tuple[str, str]) -> dict[str, Any] | None:
+        '''
+        '''
+        if self.path is None:
+            return None
+        try:
+            with open(self._entry_path(key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _write(self, key: tuple[str, str], entry: dict[str, Any]) -> None:
+        '''
+        '''
+        if self.path is None:
+            return
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            with open(self._entry_path(key), 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            pass
+
+    # -Properties
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            'entries': len(self._entries), 'hits': self.hits,
+            'disk_hits': self.disk_hits, 'misses': self.misses,
+        }
+
+
+class MachineTree(Mapping):
+    """
+    Lazily expanded machine tree node
+        Behaves like the dict nodes of the original recursive solver
+        but only builds 'children' when they are accessed
+    """
+
+    # -Constructor
+    def __init__(self, item: str, per_second: float) -> None:
+        self.recipe: str = item
+        self.rate: float = per_second
+        self.count: float = per_second * get_item_factors(item)[0]
+        self._children: list[MachineTree] | None = None
+        if STATS.enabled:
+            STATS.count('calculator.machine_tree.nodes')
+
+    # -Dunder Methods
+    def __getitem__(self, key: str) -> Any:
+        if key == 'recipe':
+            return self.recipe
+        elif key == 'count':
+            return self.count
+        elif key == 'children' and 'inputs' in RECIPES[self.recipe]:
+            return self.children
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield 'recipe'
+        yield 'count'
+        if 'inputs' in RECIPES[self.recipe]:
+            yield 'children'
+
+    def __len__(self) -> int:
+        return 3 if 'inputs' in RECIPES[self.recipe] else 2
+
+    def __repr__(self) -> str:
+        return f"MachineTree(recipe={self.recipe}, count={self.count})"
+
+    # -Properties
+    @property
+    def children(self) -> list[MachineTree]:
+        if self._children is None:
+            crafts = self.rate * get_item_factors(self.recipe)[1]
+            self._children = [
+                MachineTree(input_item, input_count * crafts)
+                for input_item, input_count in RECIPES[self.recipe].get('inputs', {}).items()
+            ]
+        return self._children
+
+
+class ResourceTable(Mapping):
+    """
+    Assembly Line 2 Resource Table
+        Maps editor resource ids (ResourceType/BlueprintResult) to recipe names and machines
+        Loaded once from a generated, versioned json table; names are interned and
+        looked up by id through dense lists
+    """
+
+    # -Constructor
+    def __init__(self, path: Path | None = None) -> None:
+        self.path: Path | None = path
+        self.version: int = 0
+        self._names: list[str | None] | None = None
+        self._machines: list[str | None] = []
+        self._ids: dict[str, int] = {}
+
+    # -Dunder Methods
+    def __getitem__(self, _id: int) -> str:
+        names = self.names
+        valid = isinstance(_id, int) and not isinstance(_id, bool) and 0 <= _id < len(names)
+        name = names[_id] if valid else None
+        if name is None:
+            raise KeyError(_id)
+        return name
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ids.values())
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __repr__(self) -> str:
+        if self._names is None:
+            return f"ResourceTable(path={self.path}, loaded=False)"
+        return f"ResourceTable(path={self.path}, version={self.version}, resources={len(self._ids)})"
+
+    # -Instance Methods
+    def id_of(self, name: str) -> int:
+        '''Gets the resource id of a recipe name'''
+        return self.ids[name]
+
+    def machine_of(self, _id: int) -> str:
+        '''Gets the machine that makes a resource id'''
+        machines = self.machines
+        valid = isinstance(_id, int) and not isinstance(_id, bool) and 0 <= _id < len(machines)
+        machine = machines[_id] if valid else None
+        if machine is None:
+            raise KeyError(_id)
+        return machine
+
+    def load(self) -> None:
+        '''Reads the table, or generates one from RECIPES when it has no file yet'''
+        self._names = []
+        self._machines = []
+        self._ids = {}
+        self.version = 0
+        if self.path is None or not self.path.exists():
+            self.update(RECIPES)
+            return
+        with open(self.path, 'r') as f:
+            table = json.load(f)
+        self.version = table['version']
+        for entry in table['resources']:
+            self._set(entry['id'], entry['name'], entry['machine'])
+
+    def update(self, recipes: Mapping[str, dict[str, Any]]) -> bool:
+        '''
+        Brings the table in line with a recipe book and bumps its version when anything changed
+            Existing ids are kept stable, new recipes are appended after the highest id
+        '''
+        names = self.names
+        changed = False
+        for name, recipe in recipes.items():
+            _id = self._ids.get(name)
+            if _id is None:
+                _id = len(names)
+            elif self._machines[_id] == recipe['machine']:
+                continue
+            self._set(_id, name, recipe['machine'])
+            changed = True
+        if changed:
+            self.version += 1
+        return changed
+
+    def save(self, path: Path | None = None) -> None:
+        '''Writes the table as json'''
+        resources = [
+            {'id': _id, 'name': name, 'machine': self._machines[_id]}
+            for _id, name in enumerate(self.names) if name is not None
+        ]
+        with open(path or self.path, 'w') as f:
+            json.dump({'version': self.version, 'resources': resources}, f, indent=2)
+            f.write('\n')
+
+    def _set(self, _id: int, name: str, machine: str) -> None:
+        '''
+        '''
+        if _id >= len(self._names):
+            padding = _id + 1 - len(self._names)
+            self._names.extend([None] * padding)
+            self._machines.extend([None] * padding)
+        name = sys.intern(name)
+        self._names[_id] = name
+        self._machines[_id] = sys.intern(machine)
+        self._ids[name] = _id
+
+    # -Properties
+    @property
+    def ids(self) -> dict[str, int]:
+        self.names
+        return self._ids
+
+    @property
+    def loaded(self) -> bool:
+        return self._names is not None
+
+    @property
+    def machines(self) -> list[str | None]:
+        self.names
+        return self._machines
+
+    @property
+    def names(self) -> list[str | None]:
+        if self._names is None:
+            self.load()
+        return self._names
+
+
+## Globals
+RECIPES: RecipeBook = RecipeBook(RECIPES_PATH)
+RESOURCES: ResourceTable = ResourceTable(RESOURCES_PATH)
+SOLVE_CACHE: SolveCache = SolveCache()
+MACHINE_UPGRADES: dict[str, list[float]] | None = None  # -Machine -> speed multiplier per upgrade level
+MACHINE_LEVELS: dict[str, int] = {}  # -Machine -> current upgrade level (default 0)
+MACHINE_SPEEDS: dict[str, float] = {}  # -Machine -> speed multiplier overriding its level (see set_machine_speed)
 
 
 ## Functions
-def generate_base_recipes() -> None:
-    """Generates all the base item recipes"""
+def generate_resource_table(path: Path = RESOURCES_PATH) -> ResourceTable:
+    """Updates (or creates) the resource table file so every recipe has an id"""
+    table = ResourceTable(path)
+    if table.update(RECIPES) or not path.exists():
+        table.save()
+    return table
+
+
+def load_machine_upgrades(path: Path = UPGRADES_PATH) -> dict[str, list[float]]:
+    """Loads the speed multiplier of every machine upgrade level"""
+    global MACHINE_UPGRADES, RECIPES
+    with open(path, 'r') as f:
+        upgrades = json.load(f)
+    for machine, levels in upgrades.items():
+        if machine not in MACHINES:
+            raise KeyError(f"Machine '{machine}' not valid")
+        if not levels['speeds'] or min(levels['speeds']) <= 0:
+            raise ValueError(f"Speeds of '{machine}' not valid")
+    reloaded = MACHINE_UPGRADES is not None
+    MACHINE_UPGRADES = {machine: list(levels['speeds']) for machine, levels in upgrades.items()}
+    if reloaded:
+        RECIPES.changed()
+    return MACHINE_UPGRADES
+
+
+def get_machine_speed(machine: str) -> float:
+    """Gets the speed multiplier of a machine at its current upgrade level (or override)"""
+    global MACHINE_LEVELS, MACHINE_SPEEDS, MACHINE_UPGRADES
+    speed = MACHINE_SPEEDS.get(machine)
+    if speed is not None:
+        return speed
+    if MACHINE_UPGRADES is None:
+        load_machine_upgrades()
+    speeds = MACHINE_UPGRADES.get(machine, (1.0,))
+    return speeds[MACHINE_LEVELS.get(machine, 0)]
+
+
+def get_machine_speeds() -> dict[str, float]:
+    """Gets the current speed multiplier of every machine"""
+    return {machine: get_machine_speed(machine) for machine in MACHINES}
+
+
+def set_machine_level(machine: str, level: int) -> None:
+    """Upgrades (or downgrades) a whole machine tier"""
+    global MACHINE_LEVELS, MACHINE_UPGRADES, RECIPES
+    if machine not in MACHINES:
+        raise KeyError(f"Machine '{machine}' not valid")
+    if MACHINE_UPGRADES is None:
+        load_machine_upgrades()
+    if not 0 <= level < len(MACHINE_UPGRADES.get(machine, (1.0,))):
+        raise ValueError(f"Level '{level}' of '{machine}' not valid")
+    MACHINE_LEVELS[machine] = level
+    RECIPES.changed()
+
+
+def set_machine_speed(machine: str, speed: float | None) -> None:
+    """Overrides the speed multiplier of a whole machine tier (None: back to its level)"""
+    global MACHINE_SPEEDS, RECIPES
+    if machine not in MACHINES:
+        raise KeyError(f"Machine '{machine}' not valid")
+    if speed is None:
+        MACHINE_SPEEDS.pop(machine, None)
+    elif not math.isfinite(speed) or speed <= 0:
+        raise ValueError(f"Speed '{speed}' of '{machine}' not valid")
+    else:
+        MACHINE_SPEEDS[machine] = speed
+    RECIPES.changed()
+
+
+def get_item_factors(item: str) -> tuple[float, float]:
+    """
+    Gets (machines per item/sec, crafts per item/sec) of an item
+        A craft takes the recipe's time (default: the MACHINES factor) divided by the
+        machine speed and yields the recipe's output quantity (default: 1)
+    """
     global MACHINES, RECIPES
-    for machine in ('starter1', 'wire', 'cable', 'cutter', 'furnace', 'press'):
-        for element in ('aluminium', 'copper', 'diamond', 'gold', 'iron'):
-            recipe = { 'machine': machine }
-            if machine == 'starter1':
-                RECIPES[element] = recipe
-            else:
-                name: str = f"{element}_"
-                if machine == 'cutter':
-                    name += "gear"
-                elif machine == 'furnace':
-                    name += "liquid"
-                elif machine == 'press':
-                    name += "plate"
-                else:
-                    name += machine
-                if machine == 'cable':
-                    recipe['inputs'] = { f'{element}_wire': 3 }
-                else:
-                    recipe['inputs'] = { element: 1 }
-                RECIPES[name] = recipe
-    for machine in ('starter2', 'wire', 'cable', 'refinery'):
-        for element in ('plutonium', 'uranium'):
-            recipe = { 'machine': machine }
-            if machine == 'starter2':
-                RECIPES[element] = recipe
-            else:
-                name: str = f"{element}_{machine}" 
-                if machine == 'cable':
-                    recipe['inputs'] = { f'{element}_wire': 3 }
-                else:
-                    recipe['inputs'] = { element: 1 }
+    factors = RECIPES.derived.get('factors')
+    if factors is None:
+        factors = RECIPES.derived['factors'] = {}
+    item_factors = factors.get(item)
+    if item_factors is None:
+        recipe = RECIPES[item]
+        machine = recipe['machine']
+        crafts = 1.0 / recipe.get('output', 1)
+        time = recipe.get('time', MACHINES[machine]) / get_machine_speed(machine)
+        item_factors = factors[item] = (crafts * time, crafts)
+    return item_factors
+
+
+def what_if(
+    targets: Mapping[str, float],
+    levels: Mapping[str, int] | None = None,
+    speeds: Mapping[str, float] | None = None,
+) -> dict[str, Any]:
+    """
+    Compares the plan for targets before and after upgrading machine tiers
+        levels: machine -> upgrade level, speeds: machine -> speed multiplier
+        Gets both plans and the change in whole machines per machine type
+    """
+    global MACHINE_LEVELS, MACHINE_SPEEDS, RECIPES
+    before = plan(targets)
+    saved_levels, saved_speeds = (dict(MACHINE_LEVELS), dict(MACHINE_SPEEDS))
+    try:
+        for machine, level in (levels or {}).items():
+            set_machine_level(machine, level)
+        for machine, speed in (speeds or {}).items():
+            set_machine_speed(machine, speed)
+        after = plan(targets)
+    finally:
+        MACHINE_LEVELS.clear()
+        MACHINE_LEVELS.update(saved_levels)
+        MACHINE_SPEEDS.clear()
+        MACHINE_SPEEDS.update(saved_speeds)
+        RECIPES.changed()
+    machines = {
+        machine: after['machines'].get(machine, {}).get('built', 0) - total['built']
+        for machine, total in before['machines'].items()
+    }
+    return {'before': before, 'after': after, 'machines': machines}
 
 
 def add_recipe(output: str, machine: str, **inputs: int) -> None:
     """Adds a recipe and checks to make sure all predecessor items and machines are available"""
     global MACHINES, RECIPES
-    if machine not in MACHINES:
-        raise KeyError(f"Machine '{machine}' not valid")
-    item_stack = list(inputs.keys())
-    while item_stack:
-        item = item_stack.pop(0)
-        item_recipe = RECIPES.get(item, None)
-        if item_recipe is None:
-            raise KeyError(f"Item '{item}' not valid")
-        if item_recipe['machine'] not in ('starter1', 'starter2'):
-            item_stack.extend(item_recipe['inputs'].keys())
-    # -Valid Item
-    RECIPES[output] = {'machine': machine, 'inputs': inputs }
+    RECIPES.register(output, {'machine': machine, 'inputs': inputs })
     return output
 
 
-def get_machine_count(item: str, per_second: float = 1.0) -> dict[str, Any]:
-    """Gets total number of machines to produce a certain item/per second"""
+def add_recipes(recipes: Mapping[str, dict[str, Any]] | Iterable[tuple[str, str, dict[str, int]]]) -> list[str]:
+    """Adds a whole recipe pack (name -> recipe or (output, machine, inputs) tuples) in linear time"""
     global MACHINES, RECIPES
-    recipe = RECIPES[item]
-    base_machines = per_second * MACHINES[recipe['machine']]
-    machines: dict[str, Any] = {
-        'recipe': item,
-        'count': base_machines,
+    if not isinstance(recipes, Mapping):
+        recipes = {
+            output: {'machine': machine, 'inputs': dict(inputs)}
+            for output, machine, inputs in recipes
+        }
+    return RECIPES.register_many(recipes)
+
+
+def get_recipe_order() -> list[str]:
+    """Gets every recipe item in topological order (inputs before outputs)"""
+    global RECIPES
+    order = RECIPES.derived.get('order')
+    if order is not None:
+        return order
+    order: list[str] = []
+    visited: set[str] = set()
+    for root in RECIPES:
+        if root in visited:
+            continue
+        visited.add(root)
+        stack = [(root, iter(RECIPES[root].get('inputs', ())))]
+        while stack:
+            item, inputs = stack[-1]
+            for input_item in inputs:
+                if input_item not in visited:
+                    visited.add(input_item)
+                    stack.append((input_item, iter(RECIPES[input_item].get('inputs', ()))))
+                    break
+            else:
+                stack.pop()
+                order.append(item)
+    RECIPES.derived['order'] = order
+    return order
+
+
+def get_consumers(item: str, transitive: bool = False) -> set[str]:
+    """Gets the items that use an item directly (or anywhere down the line)"""
+    global RECIPES
+    if transitive:
+        return RECIPES.dependents(item)
+    return set(RECIPES.consumers(item))
+
+
+def get_requirements(item: str, per_unit: float = 1.0, raw: bool = False) -> dict[str, float]:
+    """Gets how much of every upstream item (or only starter resources) producing an item needs"""
+    global RECIPES
+    return {
+        upstream: amount * per_unit
+        for upstream, amount in RECIPES.requirements(item).items()
+        if not raw or 'inputs' not in RECIPES[upstream]
+    }
+
+
+def get_impact(item: str, fraction: float, supply: float = 1.0) -> dict[str, dict[str, float]]:
+    """
+    Gets how a drop in an item's supply hits every end product that (transitively) uses it
+        supply: items/sec of item available before the drop
+        Gets end product -> amount needed per unit, max rate before/after and the rate lost
+    """
+    global RECIPES
+    impact: dict[str, dict[str, float]] = {}
+    for product in RECIPES.dependents(item):
+        if RECIPES.consumers(product):
+            continue
+        amount = RECIPES.requirements(product)[item]
+        impact[product] = {
+            'per_unit': amount,
+            'rate': supply / amount,
+            'reduced_rate': supply * (1.0 - fraction) / amount,
+            'lost': supply * fraction / amount,
+        }
+    return impact
+
+
+def get_machine_totals(item: str, per_second: float = 1.0) -> dict[str, dict[str, Any]]:
+    """Gets the merged machine demand of every item needed to produce a certain item/per second"""
+    global SOLVE_CACHE
+    return {
+        output: {'rate': total['rate'] * per_second, 'machine': total['machine'], 'count': total['count'] * per_second}
+        for output, total in SOLVE_CACHE.get(item)['totals'].items()
     }
-    # -Starter found
-    if 'inputs' not in recipe:
-        return machines
-    children = []
-    for input_item, input_count in recipe['inputs'].items():
-        child = get_machine_count(input_item, input_count * base_machines)
-        children.append(child)
-    machines['children'] = children
-    return machines
 
 
-def get_starter_count(machine_data: dict[str, Any]) -> float:
+def _solve_machine_totals(item: str, per_second: float = 1.0) -> dict[str, dict[str, Any]]:
     """
+    Solves the merged machine demand of an item/per second
+        Single pass over the topological order, so shared subtrees are only summed once
     """
     global MACHINES, RECIPES
+    if item not in RECIPES:
+        raise KeyError(f"Item '{item}' not valid")
+    rates: dict[str, float] = {item: per_second}
+    totals: dict[str, dict[str, Any]] = {}
+    for output in reversed(get_recipe_order()):
+        rate = rates.get(output)
+        if rate is None:
+            continue
+        recipe = RECIPES[output]
+        machines, crafts = get_item_factors(output)
+        totals[output] = {'rate': rate, 'machine': recipe['machine'], 'count': rate * machines}
+        for input_item, input_count in recipe.get('inputs', {}).items():
+            rates[input_item] = rates.get(input_item, 0.0) + input_count * rate * crafts
+    return totals
+
+
+def compile_recipes() -> CompiledRecipes:
+    """Gets the compiled matrix form of RECIPES, rebuilt after recipes change"""
+    global RECIPES
+    compiled = RECIPES.derived.get('compiled')
+    if compiled is None:
+        compiled = RECIPES.derived['compiled'] = CompiledRecipes()
+    return compiled
+
+
+def solve_batch(targets: Mapping[str, Any] | Any) -> dict[str, Any]:
+    """Gets machine and starter counts for a batch of demand vectors"""
+    return compile_recipes().solve_batch(targets)
+
+
+@instrumented('calculator.get_machine_count')
+def get_machine_count(item: str, per_second: float = 1.0) -> MachineTree:
+    """Gets total number of machines to produce a certain item/per second"""
+    return MachineTree(item, per_second)
+
+
+@instrumented('calculator.get_starter_count')
+def get_starter_count(machine_data: Mapping[str, Any]) -> float:
+    """Gets total number of starters feeding a machine tree"""
+    global MACHINES, RECIPES, SOLVE_CACHE
+    if isinstance(machine_data, MachineTree):
+        STATS.count('calculator.get_starter_count.nodes')
+        return SOLVE_CACHE.get(machine_data.recipe)['starters'] * machine_data.rate
+    return _get_starter_count(machine_data)
+
+
+def _get_starter_count(machine_data: Mapping[str, Any]) -> float:
+    """Walks a plain (dict) machine tree summing its starters"""
+    if STATS.enabled:
+        STATS.count('calculator.get_starter_count.nodes')
     starter_count: float = 0
     if not 'children' in machine_data:
         return machine_data['count']
     for child in machine_data['children']:
-        starter_count += get_starter_count(child)
+        starter_count += _get_starter_count(child)
     return starter_count
 
 
-def generate_machine_graph(machine_data: dict[str, Any], file_name: str, format: str = 'png') -> None:
+def get_machine_plan(item: str, per_second: float = 1.0) -> dict[str, Any]:
+    """
+    Gets a whole-factory machine plan to produce a certain item/per second
+        Demand is merged per item before rounding up to whole machines once
+    """
+    totals = get_machine_totals(item, per_second)
+    return {'items': totals, 'machines': _get_machine_summary(totals)}
+
+
+def plan(targets: Mapping[str, float]) -> dict[str, Any]:
     """
+    Gets one merged factory plan for several items/per second at once
+        Shared intermediates are summed across targets before rounding to whole machines
+        items/machines match get_machine_plan, starters holds the starter machines per raw
+        resource and breakdown how much of every item each target uses (item -> target -> rate)
+    """
+    global RECIPES, SOLVE_CACHE
+    totals: dict[str, dict[str, Any]] = {}
+    breakdown: dict[str, dict[str, float]] = {}
+    for target, per_second in targets.items():
+        if target not in RECIPES:
+            raise KeyError(f"Item '{target}' not valid")
+        if not math.isfinite(per_second) or per_second < 0:
+            raise ValueError(f"Rate '{per_second}' for '{target}' not valid")
+        # -Demand is linear, so each target is its cached per-unit solve scaled
+        for output, total in SOLVE_CACHE.get(target)['totals'].items():
+            merged = totals.get(output)
+            if merged is None:
+                merged = totals[output] = {'rate': 0.0, 'machine': total['machine'], 'count': 0.0}
+            merged['rate'] += total['rate'] * per_second
+            merged['count'] += total['count'] * per_second
+            usage = breakdown.setdefault(output, {})
+            usage[target] = usage.get(target, 0.0) + total['rate'] * per_second
+    starters = {
+        output: total['count'] for output, total in totals.items()
+        if 'inputs' not in RECIPES[output]
+    }
+    return {
+        'items': totals,
+        'machines': _get_machine_summary(totals),
+        'starters': starters,
+        'breakdown': breakdown,
+    }
+
+
+def _get_machine_summary(totals: Mapping[str, dict[str, Any]]) -> dict[str, dict[str, float]]:
+    """
+    Rounds every item up to whole machines (in place) and sums them per machine type
+    """
+    machines: dict[str, dict[str, float]] = {}
+    for total in totals.values():
+        built = _whole_machines(total['count'])
+        total['machines'] = built
+        total['utilization'] = total['count'] / built if built else 0.0
+        machine = machines.setdefault(total['machine'], {'required': 0.0, 'built': 0})
+        machine['required'] += total['count']
+        machine['built'] += built
+    for machine in machines.values():
+        machine['slack'] = machine['built'] - machine['required']
+        machine['utilization'] = machine['required'] / machine['built'] if machine['built'] else 0.0
+    return machines
+
+
+def get_max_rate(item: str, budget: Mapping[str, int]) -> dict[str, Any]:
+    """
+    Gets the highest item/per second whose whole-machine plan fits a machine budget
+        budget: machine type -> machines available, missing types are unlimited
+    """
+    global MACHINES
+    for machine in budget:
+        if machine not in MACHINES:
+            raise KeyError(f"Machine '{machine}' not valid")
+    # -Demand is linear in rate, so one per-unit solve covers every rate
+    per_unit = get_machine_totals(item, 1.0)
+    required: dict[str, float] = {}
+    for total in per_unit.values():
+        required[total['machine']] = required.get(total['machine'], 0.0) + total['count']
+    bounds = [budget[machine] / count for machine, count in required.items() if machine in budget and count > 0]
+    if not bounds:
+        raise ValueError(f"Budget does not limit any machine used by '{item}'")
+    def _fits(rate: float) -> bool:
+        '''
+        '''
+        built: dict[str, int] = {}
+        for total in per_unit.values():
+            built[total['machine']] = built.get(total['machine'], 0) + _whole_machines(total['count'] * rate)
+        return all(built.get(machine, 0) <= limit for machine, limit in budget.items())
+    # -Binary search the rate, then raise it to the edge of its machine counts
+    low, high = 0.0, min(bounds)
+    if _fits(high):
+        low = high
+    for _ in range(64):
+        middle = (low + high) / 2
+        if _fits(middle):
+            low = middle
+        else:
+            high = middle
+    if low > 0:
+        low = min(
+            _whole_machines(total['count'] * low) / total['count']
+            for total in per_unit.values() if total['count'] > 0
+        )
+    plan = get_machine_plan(item, low)
+    plan['rate'] = low
+    return plan
+
+
+def optimize(
+    starters: Mapping[str, float] | None = None,
+    machines: Mapping[str, float] | None = None,
+    values: Mapping[str, float] | None = None,
+) -> dict[str, Any]:
+    """
+    Finds the output mix with the most value under starter and machine limits
+        starters: raw resource -> starter machines available for it
+        machines: machine type -> machines available (time factors from MACHINES)
+        values: item -> value per item/sec (default: 1 for every crafted item, i.e. total rate)
+    Solved as a linear program (simplex) over the per-unit machine demand of every item;
+    missing limits are unlimited. Gets the rates, their merged plan, and per constraint
+    the limit, use, slack and shadow price (value gained per extra machine), plus which bind
+    """
+    import numpy
+    global MACHINES, RECIPES
+    starters = starters or {}
+    machines = machines or {}
+    for resource in starters:
+        if resource not in RECIPES or 'inputs' in RECIPES[resource]:
+            raise KeyError(f"Resource '{resource}' not valid")
+    for machine in machines:
+        if machine not in MACHINES:
+            raise KeyError(f"Machine '{machine}' not valid")
+    if values is None:
+        values = {item: 1.0 for item in RECIPES if 'inputs' in RECIPES[item]}
+    compiled = compile_recipes()
+    items = [item for item, value in values.items() if value > 0]
+    for item in items:
+        if item not in compiled.index:
+            raise KeyError(f"Item '{item}' not valid")
+    # -Constraint rows: machines needed per unit of every candidate item
+    per_unit = compiled.demand[[compiled.index[item] for item in items]] * compiled.factors
+    names: list[str] = []
+    rows: list[Any] = []
+    limits: list[float] = []
+    for resource, limit in starters.items():
+        names.append(f"starter:{resource}")
+        rows.append(per_unit[:, compiled.index[resource]])
+        limits.append(limit)
+    for machine, limit in machines.items():
+        columns = [i for i, item_machine in enumerate(compiled.machines) if item_machine == machine]
+        names.append(f"machine:{machine}")
+        rows.append(per_unit[:, columns].sum(axis=1))
+        limits.append(limit)
+    if not rows:
+        raise ValueError("Optimization needs at least one starter or machine limit")
+    A = numpy.array(rows, dtype=float)
+    b = numpy.array(limits, dtype=float)
+    c = numpy.array([values[item] for item in items], dtype=float)
+    unbounded = [item for i, item in enumerate(items) if not A[:, i].any()]
+    if unbounded:
+        raise ValueError(f"Limits do not bound '{unbounded[0]}'")
+    x, duals = _simplex(c, A, b)
+    rates = {item: float(rate) for item, rate in zip(items, x) if rate > 1e-9}
+    used = A @ x
+    constraints = {
+        name: {
+            'limit': float(limit), 'used': float(use),
+            'slack': float(limit - use), 'shadow_price': float(dual),
+        }
+        for name, limit, use, dual in zip(names, b, used, duals)
+    }
+    return {
+        'rates': rates,
+        'value': float(c @ x),
+        'plan': plan(rates),
+        'constraints': constraints,
+        'binding': [name for name, constraint in constraints.items() if constraint['slack'] <= 1e-9],
+    }
+
+
+def _simplex(c: Any, A: Any, b: Any) -> tuple[Any, Any]:
+    """
+    Maximizes c.x subject to A.x <= b, x >= 0 with b >= 0 (the origin is feasible)
+        Dense tableau simplex with Bland's rule; gets (x, constraint duals)
+    """
+    import numpy
+    if (b < 0).any():
+        raise ValueError("Limits must not be negative")
+    m, n = A.shape
+    tableau = numpy.zeros((m + 1, n + m + 1), dtype=float)
+    tableau[:m, :n] = A
+    tableau[:m, n:n + m] = numpy.eye(m)
+    tableau[:m, -1] = b
+    tableau[-1, :n] = -c
+    basis = list(range(n, n + m))
+    epsilon = 1e-12
+    while True:
+        entering = numpy.flatnonzero(tableau[-1, :-1] < -epsilon)
+        if not len(entering):
+            break
+        column = entering[0]
+        candidates = numpy.flatnonzero(tableau[:m, column] > epsilon)
+        if not len(candidates):
+            raise ValueError("Optimization is unbounded")
+        ratios = tableau[candidates, -1] / tableau[candidates, column]
+        best = ratios.min()
+        ties = candidates[ratios <= best + epsilon]
+        row = min(ties, key=basis.__getitem__)
+        tableau[row] /= tableau[row, column]
+        for i in range(m + 1):
+            if i != row and tableau[i, column]:
+                tableau[i] -= tableau[i, column] * tableau[row]
+        basis[row] = column
+    x = numpy.zeros(n + m, dtype=float)
+    for row, column in enumerate(basis):
+        x[column] = tableau[row, -1]
+    return (x[:n], tableau[-1, n:n + m].copy())
+
+
+def _whole_machines(count: float) -> int:
+    """Rounds a machine count up to whole machines, ignoring float noise"""
+    return math.ceil(round(count, 9))
+
+
+@instrumented('calculator.generate_machine_graph')
+def generate_machine_graph(
+    machine_data: Mapping[str, Any], file_name: str, format: str = 'png', merged: bool = False
+) -> None:
+    """
+    Renders a machine tree with graphviz
+        merged: one node per item with summed edge counts instead of one node per tree occurrence
     """
     # -Internal Variables
     import graphviz
-    global MACHINES, RECIPES
-    _id = 0
     graph = graphviz.Digraph()
+    # -Body
+    nodes = edges = 0
+    for kind, *values in _iter_machine_graph(machine_data, merged):
+        if kind == 'node':
+            name, label, shape = values
+            graph.node(name, label=label, shape=shape)
+            nodes += 1
+        else:
+            tail, head, label = values
+            graph.edge(tail, head, label=label)
+            edges += 1
+    STATS.count('calculator.generate_machine_graph.nodes', nodes)
+    STATS.count('calculator.generate_machine_graph.edges', edges)
+    graph.format = format
+    with STATS.timer('calculator.generate_machine_graph.render'):
+        graph.render(f"{file_name}.gv")
+
+
+def write_machine_dot(machine_data: Mapping[str, Any], file: Path | TextIO, merged: bool = True) -> None:
+    """
+    Streams a machine tree as DOT text to a file without graphviz
+        Nodes and edges are written as they are generated, so huge plans never sit in memory
+    """
     # -Internal Functions
-    def _generate_machine_graph(machine_data: dict[str, Any], level=0) -> list[str]:
+    def _quote(value: str) -> str:
+        '''
         '''
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    def _write_machine_dot(f: TextIO) -> None:
         '''
-        nonlocal _id
-        item = machine_data['recipe']
-        count = machine_data['count']
+        '''
+        f.write("digraph {\n")
+        for kind, *values in _iter_machine_graph(machine_data, merged):
+            if kind == 'node':
+                name, label, shape = values
+                f.write(f"\t{_quote(name)} [label={_quote(label)} shape={shape}]\n")
+            else:
+                tail, head, label = values
+                f.write(f"\t{_quote(tail)} -> {_quote(head)} [label={_quote(label)}]\n")
+        f.write("}\n")
+    # -Body
+    if isinstance(file, (str, Path)):
+        with open(file, 'w') as f:
+            _write_machine_dot(f)
+    else:
+        _write_machine_dot(file)
+
+
+def _get_node_style(item: str) -> tuple[str, str, str]:
+    """Gets the (name prefix, label, shape) of an item's graph node"""
+    global RECIPES
+    machine = RECIPES[item]['machine']
+    label = ' '.join(n.capitalize() for n in item.split('_'))
+    # -Shape:
+    # --Starter=Triangle
+    if machine in ('starter1', 'starter2'):
+        return ("st", label, "invtriangle")
+    # --Crafter1=Pentagon
+    elif machine == 'crafter1':
+        return ("c1", label, "pentagon")
+    # --Crafter2=Hexagon
+    elif machine == 'crafter2':
+        return ("c2", label, "hexagon")
+    # --Crafter3=Octagon
+    elif machine == 'crafter3':
+        return ("c3", label, "septagon")
+    # --Crafter4=Octagon
+    elif machine == 'crafter4':
+        return ("c4", label, "octagon")
+    # --Crafter5=Octagon
+    elif machine == 'crafter5':
+        return ("c5", label, "doubleoctagon")
+    # --Wire, Cable, Cutter, Furnace, Press=Diamond
+    return (machine[:2], machine.capitalize(), "diamond")
+
+
+def _iter_machine_graph(machine_data: Mapping[str, Any], merged: bool = False) -> Iterator[tuple[str, str, str, str]]:
+    """
+    Generates ('node', name, label, shape) and ('edge', tail, head, label) entries for a machine tree
+        Walks the recipes directly so lazily built trees are never expanded in memory
+    """
+    global MACHINES, RECIPES
+    item = machine_data['recipe']
+    if isinstance(machine_data, MachineTree):
+        per_second = machine_data.rate
+    else:
+        per_second = machine_data['count'] / get_item_factors(item)[0]
+    # -Merged: One node per item
+    if merged:
+        totals = get_machine_totals(item, per_second)
+        for output in totals:
+            _, label, shape = _get_node_style(output)
+            yield ('node', output, label, shape)
+        for output, total in totals.items():
+            crafts = total['rate'] * get_item_factors(output)[1]
+            for input_item, input_count in RECIPES[output].get('inputs', {}).items():
+                count = input_count * crafts * get_item_factors(input_item)[0]
+                yield ('edge', input_item, output, str(round(count, 2)))
+        return
+    # -Tree: One node per occurrence
+    _id = 0
+    stack: list[tuple[str, float, int, str | None]] = [(item, per_second, 0, None)]
+    while stack:
+        item, per_second, level, parent = stack.pop()
         recipe = RECIPES[item]
-        machine = recipe['machine']
-        label = ' '.join(n.capitalize() for n in item.split('_'))
-        # --Shape:
-        # ---Starter=Triangle
-        if machine in ('starter1', 'starter2'):
-            name = "st"
-            shape = "invtriangle"
-        # ---Crafter1=Pentagon
-        elif machine == 'crafter1':
-            name = "c1"
-            shape = "pentagon"
-        # ---Crafter2=Hexagon
-        elif machine == 'crafter2':
-            name = "c2"
-            shape = "hexagon"
-        # ---Crafter3=Octagon
-        elif machine == 'crafter3':
-            name = "c3"
-            shape = "septagon"
-        # ---Crafter4=Octagon
-        elif machine == 'crafter4':
-            name = "c4"
-            shape = "octagon"
-        # ---Crafter5=Octagon
-        elif machine == 'crafter5':
-            name = "c5"
-            shape = "doubleoctagon"
-        # ---Wire, Cable, Cutter, Furnace, Press=Diamond
-        else:
-            name = machine[:2]
-            label = machine.capitalize()
-            shape = "diamond"
+        machines, crafts = get_item_factors(item)
+        count = per_second * machines
+        name, label, shape = _get_node_style(item)
         name += f"{level}{_id}"
         _id += 1
-        graph.node(name, label=label, shape=shape)
-        # -Children
-        if 'children' not in machine_data:
-            return name
-        for child in machine_data['children']:
-            #child_count = math.ceil(child['count'])
-            child_count = round(child['count'], 2)
-            child_name = _generate_machine_graph(child, level+1)
-            graph.edge(child_name, name, label=str(child_count))
-        return name
-    # -Body
-    _ = _generate_machine_graph(machine_data)
-    graph.format = format
-    graph.render(f"{file_name}.gv")
+        yield ('node', name, label, shape)
+        if parent is not None:
+            yield ('edge', name, parent, str(round(count, 2)))
+        for input_item, input_count in reversed(recipe.get('inputs', {}).items()):
+            stack.append((input_item, input_count * per_second * crafts, level + 1, name))
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Solves one item/per second, prints its starter count and renders its machine graph"""
+    import argparse
+    from instrumentation import capture
+    parser = argparse.ArgumentParser(description="Assembly Line 2 machine calculator")
+    parser.add_argument('item', nargs='?', default='robot')
+    parser.add_argument('rate', nargs='?', type=float, default=1.5, help="items/per second")
+    parser.add_argument('--output', default="output", help="graph file name (without .gv)")
+    parser.add_argument('--stats', action='store_true', help="print counters and timings as json")
+    parser.add_argument('--profile', type=Path, default=None, help="write a cProfile capture to this file")
+    parser.add_argument('--trace-memory', action='store_true', help="print tracemalloc peak and top sites")
+    args = parser.parse_args(argv)
+    with capture(args.stats, args.profile, args.trace_memory) as results:
+        data = get_machine_count(args.item, args.rate)
+        count = get_starter_count(data)
+        print(count)
+        generate_machine_graph(data, args.output)
+    if 'profile' in results:
+        print(results['profile'], file=sys.stderr)
+    if 'memory' in results:
+        print(json.dumps(results['memory'], indent=2), file=sys.stderr)
+    if 'stats' in results:
+        print(json.dumps(results['stats'], indent=2), file=sys.stderr)
+    return 0
 
 
 ## Body
-# -Recipes
-generate_base_recipes()
-# --[Robot]T1
-battery = add_recipe('battery', 'crafter1', copper=1, copper_liquid=1)
-circuit = add_recipe('circuit', 'crafter1', gold=1, copper_wire=1)
-electric_board = add_recipe('electric_board', 'crafter1', aluminium=1, copper_wire=1)
-engine = add_recipe('engine', 'crafter1', iron=1, iron_gear=1)
-heater_plate = add_recipe('heater_plate', 'crafter1', aluminium=1, iron_wire=1)
-solar_cell = add_recipe('solar_cell', 'crafter1', gold=1, diamond_liquid=1)
-server_rack = add_recipe('server_rack', 'crafter1', aluminium=1, iron=1)
-# --[Robot]T2
-fan = add_recipe('fan', 'crafter2', aluminium=6, diamond_gear=3, circuit=1)
-power_supply = add_recipe('power_supply', 'crafter2', diamond=6, aluminium_liquid=3, circuit=1)
-processor = add_recipe('processor', 'crafter2', gold_liquid=3, diamond_wire=3, circuit=1)
-solar_panel = add_recipe('solar_panel', 'crafter2', circuit=1, electric_board=2, solar_cell=2)
-advanced_engine = add_recipe('advanced_engine', 'crafter2', diamond=10, circuit=5, engine=5)
-computer = add_recipe('computer', 'crafter2', processor=1, power_supply=1, fan=1)
-laser = add_recipe('laser', 'crafter2', iron_liquid=5, battery=5, heater_plate=5)
-# --[Robot]T3
-super_computer = add_recipe('super_computer', 'crafter3', gold_cable=3, circuit=3, server_rack=1, computer=2)
-ai_processor = add_recipe('ai_processor', 'crafter3', copper_plate=6, copper_cable=4, circuit=10, super_computer=1)
-electric_engine = add_recipe('electric_engine', 'crafter3', iron_plate=5, battery=2, electric_board=2, advanced_engine=2)
-robot_arms = add_recipe('robot_arms', 'crafter3', iron=8, aluminium_plate=2, aluminium_cable=3, laser=2)
-robot_body = add_recipe('robot_body', 'crafter3', electric_board=5, solar_panel=2, electric_engine=1, robot_arms=1, )
-robot_head = add_recipe('robot_head', 'crafter3', gold_plate=5, diamond_cable=10, circuit=10, ai_processor=1)
-robot = add_recipe('robot', 'crafter3', iron_plate=10, diamond_cable=5, robot_body=1, robot_head=1)
-# --[Bomber]T1
-plutonium_cell = add_recipe('plutonium_cell', 'crafter4', plutonium=2, diamond_liquid=2, copper_cable=2, gold_cable=2, solar_cell=2)
-plutonium_circuit = add_recipe('plutonium_circuit', 'crafter4', copper=5, plutonium=4, diamond_wire=2, gold_cable=1, circuit=5)
-uranium_cell = add_recipe('uranium_cell', 'crafter4', uranium=2, diamond_liquid=2, copper_cable=2, gold_cable=2, solar_cell=2)
-uranium_circuit = add_recipe('uranium_circuit', 'crafter4', copper=5, uranium=4, diamond_wire=2, gold_cable=1, circuit=5)
-explosive = add_recipe('explosive', 'crafter3', diamond_wire=10, copper_cable=10, circuit=5, heater_plate=10)
-trigger = add_recipe('trigger', 'crafter3', iron=40, diamond_wire=10, circuit=5, electric_board=5)
-# --[Bomber]T2
-ignition_system = add_recipe('ignition_system', 'crafter3', battery=2, ai_processor=2, trigger=2, explosive=5)
-nuclear_cell = add_recipe('nuclear_cell', 'crafter4', electric_board=3, heater_plate=3, solar_cell=3, plutonium_cell=1, uranium_cell=1)
-nuclear_circuit = add_recipe('nuclear_circuit', 'crafter4', gold_cable=3, circuit=3, processor=3, plutonium_circuit=1, uranium_circuit=1)
-nuclear_core = add_recipe('nuclear_core', 'crafter5', diamond_cable=4, gold_cable=4, processor=10, plutonium_cell=1, uranium_cell=1, nuclear_cell=1)
-nuclear_processor = add_recipe('nuclear_processor', 'crafter5', diamond_plate=10, processor=5, ai_processor=1, plutonium_circuit=1, uranium_circuit=1, nuclear_circuit=1)
-# --[Bomber]T3
-atomic_bomb = add_recipe('atomic_bomb', 'crafter5', plutonium=15, uranium=15, ignition_system=1, nuclear_cell=1, nuclear_processor=1, nuclear_core=1)
-bomber = add_recipe('bomber', 'crafter5', ai_processor=2, robot=1, nuclear_cell=3, nuclear_processor=1, nuclear_circuit=3, atomic_bomb=1)
-# -Machines
-data = get_machine_count(robot, 1.5)
-count = get_starter_count(data)
-print(count)
-generate_machine_graph(data, "output")
+if __name__ == '__main__':
+    sys.exit(main())
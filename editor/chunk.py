@@ -8,9 +8,12 @@
 
 ## Imports
 from __future__ import annotations
+from array import array
 from collections.abc import Iterable
-from typing import ClassVar
-from .entity import Entity
+from typing import TYPE_CHECKING, ClassVar
+from .entity import Entity, EntityComponent
+if TYPE_CHECKING:
+    from .floor import Floor
 
 
 ## Classes
@@ -23,6 +26,7 @@ class Chunk:
     # -Constructor
     def __init__(self, x_offset: int, y_offset: int) -> None:
         self.offset: tuple[int, int] = (x_offset, y_offset)
+        self.floor: Floor | None = None  # -Notified of tile changes once attached
         self._tiles: list[list[Entity | None]] = [
             [None for x in range(Chunk.Size)]
             for y in range(Chunk.Size)
@@ -36,17 +40,31 @@ class Chunk:
                     continue
                 yield tile
 
-    def __getitem__(self, position: tuple[int, int]) -> None:
+    def __getitem__(self, position: tuple[int, int]) -> Entity | None:
         x, y = position
         return self._tiles[x][y]
 
-    def __setitem__(self, position: tuple[int, int], value) -> None:
+    def __setitem__(self, position: tuple[int, int], value: Entity | None) -> None:
         x, y = position
+        if self.floor is None:
+            self._tiles[x][y] = value
+            return
+        old = self._tiles[x][y]
         self._tiles[x][y] = value
+        self.floor._tile_changed(self, position, old, value)
 
     def __str__(self) -> str:
         return f"Chunk[{self.x}, {self.y}]"
 
+    # -Instance Methods
+    def tiles(self) -> Iterable[tuple[tuple[int, int], Entity]]:
+        '''Iterates ((x, y), entity) of every occupied tile in chunk coordinates'''
+        for x, x_tiles in enumerate(self._tiles):
+            for y, tile in enumerate(x_tiles):
+                if tile is None:
+                    continue
+                yield ((x, y), tile)
+
     # -Properties
     @property
     def x(self) -> int:
@@ -66,3 +84,141 @@ class Chunk:
 
     # -Class Properties
     Size: ClassVar[int] = 10
+
+
+class ArrayChunk(Chunk):
+    """
+    Assembly Line 2 Floor Chunk (array backed)
+        10x10 floor segment stored as typed arrays of entity id/direction/component index
+        with components kept in a side table; tiles are read back as ChunkEntity views
+    """
+
+    # -Constructor
+    def __init__(self, x_offset: int, y_offset: int) -> None:
+        self.offset: tuple[int, int] = (x_offset, y_offset)
+        self.floor: Floor | None = None
+        size = Chunk.Size * Chunk.Size
+        self._ids: array = array('i', [ArrayChunk.Empty]) * size
+        self._directions: array = array('b', bytes(size))
+        self._component_indices: array = array('i', [ArrayChunk.Empty]) * size
+        self._components: list[EntityComponent | None] = []
+        self._free_components: list[int] = []
+
+    # -Dunder Methods
+    def __iter__(self) -> Iterable[Entity]:
+        for index, _id in enumerate(self._ids):
+            if _id == ArrayChunk.Empty:
+                continue
+            yield ChunkEntity(self, index)
+
+    def __getitem__(self, position: tuple[int, int]) -> Entity | None:
+        x, y = position
+        index = x * Chunk.Size + y
+        if self._ids[index] == ArrayChunk.Empty:
+            return None
+        return ChunkEntity(self, index)
+
+    def __setitem__(self, position: tuple[int, int], value: Entity | None) -> None:
+        x, y = position
+        index = x * Chunk.Size + y
+        old = None
+        if self.floor is not None and self._ids[index] != ArrayChunk.Empty:
+            # -Detached copy, the tile view would already show the new value
+            old = Entity(self._ids[index], self._directions[index])
+            old.component = self._get_component(index)
+        if value is None:
+            self._ids[index] = ArrayChunk.Empty
+            self._directions[index] = 0
+            self._set_component(index, None)
+        else:
+            _id, direction, component = value.id, value.direction, value.component
+            self._ids[index] = _id
+            self._directions[index] = direction
+            self._set_component(index, component)
+        if self.floor is not None:
+            self.floor._tile_changed(self, position, old, value)
+
+    # -Instance Methods
+    def tiles(self) -> Iterable[tuple[tuple[int, int], Entity]]:
+        '''Iterates ((x, y), entity) of every occupied tile in chunk coordinates'''
+        for index, _id in enumerate(self._ids):
+            if _id == ArrayChunk.Empty:
+                continue
+            yield (divmod(index, Chunk.Size), ChunkEntity(self, index))
+
+    def _get_component(self, index: int) -> EntityComponent | None:
+        '''
+        '''
+        component_index = self._component_indices[index]
+        if component_index == ArrayChunk.Empty:
+            return None
+        return self._components[component_index]
+
+    def _set_component(self, index: int, component: EntityComponent | None) -> None:
+        '''
+        '''
+        component_index = self._component_indices[index]
+        if component is None:
+            if component_index != ArrayChunk.Empty:
+                self._components[component_index] = None
+                self._free_components.append(component_index)
+                self._component_indices[index] = ArrayChunk.Empty
+        elif component_index != ArrayChunk.Empty:
+            self._components[component_index] = component
+        elif self._free_components:
+            component_index = self._free_components.pop()
+            self._components[component_index] = component
+            self._component_indices[index] = component_index
+        else:
+            self._component_indices[index] = len(self._components)
+            self._components.append(component)
+
+    # -Class Properties
+    Empty: ClassVar[int] = -1
+
+
+class ChunkEntity(Entity):
+    """
+    Write-through view of an ArrayChunk tile
+        Reads and writes of id/direction/component go straight to the chunk arrays
+    """
+    __slots__ = ('_chunk', '_index')
+
+    # -Constructor
+    def __init__(self, chunk: ArrayChunk, index: int) -> None:
+        self._chunk: ArrayChunk = chunk
+        self._index: int = index
+
+    # -Dunder Methods
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ChunkEntity):
+            return self._chunk is other._chunk and self._index == other._index
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((id(self._chunk), self._index))
+
+    # -Properties
+    @property
+    def id(self) -> int:
+        return self._chunk._ids[self._index]
+
+    @id.setter
+    def id(self, value: int) -> None:
+        self._chunk._ids[self._index] = value
+
+    @property
+    def direction(self) -> int:
+        return self._chunk._directions[self._index]
+
+    @direction.setter
+    def direction(self, value: int) -> None:
+        self._chunk._directions[self._index] = value
+
+    @property
+    def component(self) -> EntityComponent | None:
+        return self._chunk._get_component(self._index)
+
+    @component.setter
+    def component(self, value: EntityComponent | None) -> None:
+        self._chunk._set_component(self._index, value)
@@ -12,11 +12,14 @@ from abc import ABC, abstractmethod
 
 ## Constants
 SplitterCounter = tuple[int, int, int] | tuple[float, float, float]
+# -Entity.direction -> (dx, dy) of the tile it outputs into
+DIRECTIONS: tuple[tuple[int, int], ...] = ((0, 1), (1, 0), (0, -1), (-1, 0))
 
 
 ## Classes
 class Entity:
     """Assembly Line Tile Entity"""
+    __slots__ = ('id', 'direction', 'component')
 
     # -Constructor
     def __init__(self, _id: int, direction: int = 0) -> None:
@@ -34,11 +37,12 @@ class Entity:
 
 class EntityComponent(ABC):
     """"""
-    pass
+    __slots__ = ()
 
 
 class CrafterComponent(EntityComponent):
     """Entity component for crafters (basic/advanced)"""
+    __slots__ = ('resource_id', 'inventory', 'energy')
 
     # -Constructor
     def __init__(
@@ -59,6 +63,7 @@ class CrafterComponent(EntityComponent):
 
 class ProducerComponent(EntityComponent):
     """Entity component for producers (starter/importer)"""
+    __slots__ = ('resource_id', 'timer')
 
     # -Constructor
     def __init__(self, resource_id: int | None, timer: float | None = None) -> None:
@@ -75,6 +80,7 @@ class ProducerComponent(EntityComponent):
 
 class TransporterComponent(EntityComponent):
     """Entity component for transporters (inputs/outputs)"""
+    __slots__ = ('id',)
 
     # -Constructor
     def __init__(self, _id: int) -> None:
@@ -87,6 +93,7 @@ class TransporterComponent(EntityComponent):
 
 class QueueComponent(EntityComponent):
     """Entity component for transformers (cutter/press/etc)"""
+    __slots__ = ('queue',)
 
     # -Constructor
     def __init__(self, queue: list[tuple[int, int]]) -> None:
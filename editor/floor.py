@@ -8,61 +8,392 @@
 
 ## Imports
 from __future__ import annotations
-from collections.abc import Iterable
+from collections import deque
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
 from typing import ClassVar
-from .chunk import Chunk
+from .chunk import Chunk, ChunkEntity
+from .entity import DIRECTIONS, Entity
 
 
 ## Classes
 class Floor:
+    """
+    Assembly Line 2 Floor
+        Sparse chunk index keyed by chunk coordinates, so any (even negative) position works
+        and memory follows the number of enabled chunks
+        Secondary entity type/resource indexes are built on first query and then kept
+        up to date by chunk tile writes
+        Every write bumps version and is journaled per chunk, so consumers can ask what
+        changed since the version they last saw; tile writes can be undone/redone
+    """
 
     # -Constructor
-    def __init__(self) -> None:
-        self._chunks: list[list[Chunk]] = [
-            [None for x in range(Floor.Size)]
-            for y in range(Floor.Size)
-        ]
+    def __init__(self, chunk_type: type[Chunk] = Chunk) -> None:
+        self.chunk_type: type[Chunk] = chunk_type
+        self.entity_files: dict[int, str] = {}  # -Entity type id -> save file
+        self._chunks: dict[tuple[int, int], Chunk] = {}
+        self._type_index: dict[int, set[tuple[int, int]]] | None = None
+        self._resource_index: dict[int, set[tuple[int, int]]] | None = None
+        self._indexed: dict[tuple[int, int], tuple[int, int | None]] = {}  # -Position -> (type id, resource id)
+        self.version: int = 0
+        self._journal: deque[tuple[int, tuple[int, int], tuple[int, int] | None]] = deque(maxlen=Floor.JournalLimit)
+        self._journal_start: int = 0  # -Oldest version the journal still covers
+        self._undo: deque[list[tuple[tuple[int, int], Entity | None, Entity | None]]] = deque(maxlen=Floor.HistoryLimit)
+        self._redo: list[list[tuple[tuple[int, int], Entity | None, Entity | None]]] = []
+        self._group: list[tuple[tuple[int, int], Entity | None, Entity | None]] | None = None
+        self._replaying: bool = False
+        self._tracking: bool = True
 
     # -Dunder Methods
-    def __iter__(self) -> Iterable[Entity]:
-        for x_chunks in self._chunks:
-            for chunk in x_chunks:
-                if chunk is None:
-                    continue
-                yield chunk
-
-    def __getitem__(self, position: tuple[int, int]) -> Chunk:
-        x, y = position
-        return self._chunks[x][y]
-
-    def __setitem__(self, position: tuple[int, int], value: Chunk) -> None:
-        x, y = position
-        value.offset = position
-        self._chunks[x][y] = value
+    def __iter__(self) -> Iterable[Chunk]:
+        return iter(self._chunks.values())
+
+    def __getitem__(self, position: tuple[int, int]) -> Chunk | None:
+        return self._chunks.get(position)
+
+    def __setitem__(self, position: tuple[int, int], value: Chunk | None) -> None:
+        old = self._chunks.pop(position, None)
+        if old is not None:
+            old.floor = None
+        if value is not None:
+            value.offset = position
+            value.floor = self
+            self._chunks[position] = value
+        self._drop_indexes()
+        # -Tile history can't span chunks coming and going
+        self._record(position, None)
+        self._undo.clear()
+        self._redo.clear()
+
+    def __contains__(self, position: tuple[int, int]) -> bool:
+        return position in self._chunks
 
     # -Instance Methods
     def enable_chunk(self, x: int, y: int) -> None:
-        self._chunks[x][y] = Chunk(x, y)
+        self[x, y] = self.chunk_type(x, y)
 
-    def get_chunk_from_world_coordinates(self, x: int, y: int) -> Chunk:
+    def get_chunk_from_world_coordinates(self, x: int, y: int) -> Chunk | None:
         '''
         '''
-        chunk_x, chunk_y = (x // Chunk.Size, y // Chunk.Size)
-        return self._chunks[chunk_x][chunk_y]
+        return self._chunks.get((x // Chunk.Size, y // Chunk.Size))
 
     def disable_chunk(self, x: int, y: int) -> None:
-        self._chunks[x][y] = None
+        self[x, y] = None
+
+    def get_entity(self, x: int, y: int) -> Entity | None:
+        '''Gets the entity at a world position'''
+        chunk = self._chunks.get((x // Chunk.Size, y // Chunk.Size))
+        if chunk is None:
+            return None
+        return chunk[x % Chunk.Size, y % Chunk.Size]
+
+    def set_entity(self, x: int, y: int, entity: Entity | None) -> None:
+        '''Places (or clears) the entity at a world position'''
+        chunk = self._chunks.get((x // Chunk.Size, y // Chunk.Size))
+        if chunk is None:
+            raise ValueError(f"Position ({x}, {y}) not in an enabled chunk")
+        chunk[x % Chunk.Size, y % Chunk.Size] = entity
+
+    def get_output_position(self, x: int, y: int) -> tuple[int, int] | None:
+        '''Gets the world position the entity at (x, y) outputs into'''
+        entity = self.get_entity(x, y)
+        if entity is None:
+            return None
+        dx, dy = DIRECTIONS[entity.direction % len(DIRECTIONS)]
+        return (x + dx, y + dy)
+
+    def get_output(self, x: int, y: int) -> Entity | None:
+        '''Gets the entity that the entity at (x, y) outputs into'''
+        position = self.get_output_position(x, y)
+        return self.get_entity(*position) if position is not None else None
+
+    def get_inputs(self, x: int, y: int) -> list[tuple[tuple[int, int], Entity]]:
+        '''Gets the neighbours whose output points at (x, y)'''
+        inputs = []
+        for dx, dy in DIRECTIONS:
+            neighbour = (x + dx, y + dy)
+            entity = self.get_entity(*neighbour)
+            if entity is not None and self.get_output_position(*neighbour) == (x, y):
+                inputs.append((neighbour, entity))
+        return inputs
+
+    def positions_of_type(self, _id: int) -> frozenset[tuple[int, int]]:
+        '''Gets the world positions of every entity with a type id (a copy of the index)'''
+        if self._type_index is None:
+            self._build_indexes()
+        return frozenset(self._type_index.get(_id, ()))
+
+    def positions_of_resource(self, resource_id: int) -> frozenset[tuple[int, int]]:
+        '''Gets the world positions of every entity whose component produces/crafts a resource (a copy of the index)'''
+        if self._resource_index is None:
+            self._build_indexes()
+        return frozenset(self._resource_index.get(resource_id, ()))
+
+    def entities_of_type(self, _id: int) -> Iterable[tuple[tuple[int, int], Entity]]:
+        '''
+        Gets (position, entity) of every entity with a type id, safe to edit the floor while iterating
+            Entities removed before they are reached are skipped
+        '''
+        return self._iter_entities(self.positions_of_type(_id))
+
+    def entities_of_resource(self, resource_id: int) -> Iterable[tuple[tuple[int, int], Entity]]:
+        '''
+        Gets (position, entity) of every entity making a resource, safe to edit the floor while iterating
+            Entities removed before they are reached are skipped
+        '''
+        return self._iter_entities(self.positions_of_resource(resource_id))
+
+    def _iter_entities(self, positions: Iterable[tuple[int, int]]) -> Iterable[tuple[tuple[int, int], Entity]]:
+        '''
+        '''
+        for position in list(positions):
+            entity = self.get_entity(*position)
+            if entity is not None:
+                yield (position, entity)
+
+    def reindex(self, x: int, y: int) -> None:
+        '''
+        Refreshes the indexes of one tile after its entity was changed in place (e.g. a new component)
+            The tile is journaled as changed but in place edits can't be undone
+        '''
+        self._record((x // Chunk.Size, y // Chunk.Size), (x, y))
+        if self._type_index is None:
+            return
+        self._unindex_position((x, y))
+        entity = self.get_entity(x, y)
+        if entity is not None:
+            self._index_entity((x, y), entity)
+
+    @contextmanager
+    def edit(self) -> Iterator[None]:
+        '''Groups every tile write inside the block into one version and one undo step'''
+        if self._group is not None:
+            yield
+            return
+        self.version += 1
+        self._group = []
+        try:
+            yield
+        finally:
+            group, self._group = (self._group, None)
+            if group:
+                self._undo.append(group)
+                self._redo.clear()
+
+    def undo(self) -> bool:
+        '''Reverts the last tile write (or edit group), gets False when there is nothing to undo'''
+        if not self._undo:
+            return False
+        group = self._undo.pop()
+        self._replay([(position, new, old) for position, old, new in reversed(group)])
+        self._redo.append(group)
+        return True
+
+    def redo(self) -> bool:
+        '''Reapplies the last undone tile write (or edit group), gets False when there is nothing to redo'''
+        if not self._redo:
+            return False
+        group = self._redo.pop()
+        self._replay(group)
+        self._undo.append(group)
+        return True
+
+    @contextmanager
+    def untracked(self) -> Iterator[None]:
+        '''Skips the journal and undo log for bulk writes (loading), the history is cleared afterwards'''
+        self._tracking = False
+        try:
+            yield
+        finally:
+            self._tracking = True
+            self.clear_history()
+
+    def clear_history(self) -> None:
+        '''Drops the undo/redo log and the change journal, consumers will have to start over'''
+        self._undo.clear()
+        self._redo.clear()
+        self._journal.clear()
+        self.version += 1
+        self._journal_start = self.version
+
+    def changes_since(self, version: int) -> list[tuple[int, tuple[int, int], tuple[int, int] | None]] | None:
+        '''
+        Gets (version, chunk position, world tile position) of every write after a version
+            Whole chunk changes (enabled/disabled/replaced) have no tile position
+            None when the journal no longer reaches back that far and everything must be redone
+        '''
+        if version < self._journal_start:
+            return None
+        changes = []
+        for change in reversed(self._journal):
+            if change[0] <= version:
+                break
+            changes.append(change)
+        changes.reverse()
+        return changes
+
+    def dirty_chunks(self, version: int) -> set[tuple[int, int]] | None:
+        '''Gets the positions of the chunks written after a version (None: all of them)'''
+        changes = self.changes_since(version)
+        if changes is None:
+            return None
+        return {chunk for _, chunk, _ in changes}
+
+    def affected_chunks(self, version: int) -> set[tuple[int, int]] | None:
+        '''
+        Gets the dirty chunks plus the enabled neighbours a change could flow into or out of
+            Tile changes only reach the neighbours across the chunk edges they lie on
+        '''
+        changes = self.changes_since(version)
+        if changes is None:
+            return None
+        affected = set()
+        for _, (chunk_x, chunk_y), tile in changes:
+            affected.add((chunk_x, chunk_y))
+            for dx, dy in DIRECTIONS:
+                if tile is not None:
+                    x, y = (tile[0] % Chunk.Size + dx, tile[1] % Chunk.Size + dy)
+                    if 0 <= x < Chunk.Size and 0 <= y < Chunk.Size:
+                        continue
+                neighbour = (chunk_x + dx, chunk_y + dy)
+                if neighbour in self._chunks:
+                    affected.add(neighbour)
+        return affected
+
+    def _record(self, chunk: tuple[int, int], tile: tuple[int, int] | None) -> None:
+        '''
+        Journals a write, bumping the version unless an edit group is open
+        '''
+        if not self._tracking:
+            return
+        if self._group is None:
+            self.version += 1
+        journal = self._journal
+        if len(journal) == journal.maxlen:
+            self._journal_start = journal[0][0]
+        journal.append((self.version, chunk, tile))
+
+    def _replay(self, changes: list[tuple[tuple[int, int], Entity | None, Entity | None]]) -> None:
+        '''
+        Applies undo/redo changes as one version without logging them as new edits
+        '''
+        self._replaying = True
+        try:
+            with self.edit():
+                for position, _, new in changes:
+                    self.set_entity(*position, new)
+        finally:
+            self._replaying = False
+
+    def _build_indexes(self) -> None:
+        '''
+        '''
+        self._type_index = {}
+        self._resource_index = {}
+        self._indexed = {}
+        for chunk in self._chunks.values():
+            for (x, y), entity in chunk.tiles():
+                self._index_entity((chunk.x_offset + x, chunk.y_offset + y), entity)
+
+    def _drop_indexes(self) -> None:
+        '''
+        '''
+        self._type_index = None
+        self._resource_index = None
+        self._indexed = {}
+
+    def _index_entity(self, position: tuple[int, int], entity: Entity) -> None:
+        '''
+        '''
+        self._type_index.setdefault(entity.id, set()).add(position)
+        resource_id = getattr(entity.component, 'resource_id', None)
+        if resource_id is not None:
+            self._resource_index.setdefault(resource_id, set()).add(position)
+        self._indexed[position] = (entity.id, resource_id)
+
+    def _unindex_position(self, position: tuple[int, int]) -> None:
+        '''
+        '''
+        keys = self._indexed.pop(position, None)
+        if keys is None:
+            return
+        _id, resource_id = keys
+        self._type_index[_id].discard(position)
+        if resource_id is not None:
+            self._resource_index[resource_id].discard(position)
+
+    def _tile_changed(
+        self, chunk: Chunk, position: tuple[int, int], old: Entity | None, new: Entity | None
+    ) -> None:
+        '''Called by attached chunks after a tile write'''
+        if not self._tracking and self._type_index is None:
+            return
+        world = (chunk.x_offset + position[0], chunk.y_offset + position[1])
+        if self._tracking and not self._replaying:
+            # -Array chunk tiles are views, keep a copy of what was written
+            change = (world, old, _detach(new) if isinstance(new, ChunkEntity) else new)
+            if self._group is not None:
+                self._group.append(change)
+            else:
+                self._undo.append([change])
+                self._redo.clear()
+        self._record(chunk.offset, world)
+        if self._type_index is None:
+            return
+        self._unindex_position(world)
+        if new is not None:
+            self._index_entity(world, new)
+
+    def chunks_in_rect(self, x: int, y: int, width: int, height: int) -> Iterable[Chunk]:
+        '''Iterates the enabled chunks overlapping a world-coordinate rectangle'''
+        if width <= 0 or height <= 0:
+            return
+        min_x, min_y = (x // Chunk.Size, y // Chunk.Size)
+        max_x, max_y = ((x + width - 1) // Chunk.Size, (y + height - 1) // Chunk.Size)
+        # -Scan whichever is smaller: the covered chunk range or the enabled chunks
+        if (max_x - min_x + 1) * (max_y - min_y + 1) <= len(self._chunks):
+            for chunk_x in range(min_x, max_x + 1):
+                for chunk_y in range(min_y, max_y + 1):
+                    chunk = self._chunks.get((chunk_x, chunk_y))
+                    if chunk is not None:
+                        yield chunk
+        else:
+            for (chunk_x, chunk_y), chunk in self._chunks.items():
+                if min_x <= chunk_x <= max_x and min_y <= chunk_y <= max_y:
+                    yield chunk
+
+    def entities_in_rect(self, x: int, y: int, width: int, height: int) -> Iterable[tuple[tuple[int, int], Entity]]:
+        '''Iterates ((world x, world y), entity) of every entity inside a world-coordinate rectangle'''
+        for chunk in self.chunks_in_rect(x, y, width, height):
+            for (tile_x, tile_y), entity in chunk.tiles():
+                world_x, world_y = (chunk.x_offset + tile_x, chunk.y_offset + tile_y)
+                if x <= world_x < x + width and y <= world_y < y + height:
+                    yield ((world_x, world_y), entity)
 
     # -Properties
+    @property
+    def bounds(self) -> tuple[int, int, int, int] | None:
+        '''(min x, min y, max x, max y) of the enabled chunks in chunk coordinates'''
+        if not self._chunks:
+            return None
+        xs = [x for x, _ in self._chunks]
+        ys = [y for _, y in self._chunks]
+        return (min(xs), min(ys), max(xs), max(ys))
+
     @property
     def chunk_count(self) -> int:
-        count: int = 0
-        for x_chunks in self._chunks:
-            for chunk in x_chunks:
-                if chunk is None:
-                    continue
-                count += 1
-        return count
+        return len(self._chunks)
 
     # -Class Properties
-    Size: ClassVar[int] = 10
+    Size: ClassVar[int] = 10  # -Chunks per side of a game save (spaces.json)
+    HistoryLimit: ClassVar[int] = 1000  # -Undo steps kept
+    JournalLimit: ClassVar[int] = 100000  # -Journaled writes kept for changes_since
+
+
+## Functions
+def _detach(entity: Entity) -> Entity:
+    """Copies an entity (view) into a standalone entity"""
+    copy = Entity(entity.id, entity.direction)
+    copy.component = entity.component
+    return copy
@@ -0,0 +1,269 @@
+#!/usr/bin/python
+##-------------------------------##
+## Assembly Line: Editor         ##
+## Written By: Ryan Smith        ##
+##-------------------------------##
+## Flow                          ##
+##-------------------------------##
+
+## Imports
+from __future__ import annotations
+import math
+from collections import deque
+from collections.abc import Callable, Mapping
+from typing import Any
+from .entity import QueueComponent
+from .floor import Floor
+from .simulator import (
+    CONVEYOR, EMPTY, KIND_NAMES, PRODUCER, SELLER, TRANSFORMER,
+    compile_floor,
+)
+
+## Constants
+EPSILON: float = 1e-9
+
+
+## Functions
+def analyze_floor(
+    floor: Floor, names: Mapping[int, str] | None = None,
+    machines: Mapping[int, str] | None = None,
+    targets: Mapping[str, float] | None = None,
+    tolerance: float = 0.05,
+    compiled: tuple[list[tuple[int, int]], list[Any], list[int], list[int]] | None = None,
+) -> dict[str, Any]:
+    """
+    Steady-state flow analysis of a floor without simulating it
+        names: resource id -> calculator recipe name (default: calculator.RESOURCES)
+        machines: transformer type id -> calculator machine name (wire, cutter, ...)
+        targets: recipe name -> items/sec the floor should sell
+        compiled: the floor already compiled (tracking.CompiledFloor.compile() after edits)
+    Producers are sources and machines process at calculator.get_item_factors rates,
+    using recipe ratios from calculator.RECIPES. Flows are pushed once through the floor in
+    topological order (every tile has a single output, so this is linear); conveyors and
+    sellers are unbounded. Nodes on a loop get no flow and are reported under 'cycles'
+    """
+    import calculator
+    names = calculator.RESOURCES if names is None else names
+    machines = machines or {}
+    recipes = calculator.RECIPES.recipes
+    conversions = _get_conversions(recipes)
+    positions, entities, kinds, outputs = compiled if compiled is not None else compile_floor(floor)
+    size = len(entities)
+    # -Topological order (Kahn): every node feeds at most one other
+    indegree = [0] * size
+    for output in outputs:
+        if output != EMPTY:
+            indegree[output] += 1
+    queue = deque(i for i in range(size) if not indegree[i])
+    inflow: list[dict[str, float]] = [{} for _ in range(size)]
+    nodes: dict[tuple[int, int], dict[str, Any]] = {}
+    sold: dict[str, float] = {}
+    visited = 0
+    while queue:
+        i = queue.popleft()
+        visited += 1
+        node = _solve_node(
+            kinds[i], entities[i], inflow[i], names, machines, recipes, conversions, calculator.get_item_factors
+        )
+        if kinds[i] == SELLER:
+            for name, rate in inflow[i].items():
+                sold[name] = sold.get(name, 0.0) + rate
+        elif kinds[i] != CONVEYOR:
+            nodes[positions[i]] = node
+        output = outputs[i]
+        if output == EMPTY:
+            continue
+        flows = inflow[output]
+        for name, rate in node['outflow'].items():
+            flows[name] = flows.get(name, 0.0) + rate
+        indegree[output] -= 1
+        if not indegree[output]:
+            queue.append(output)
+    cycles = sorted(positions[i] for i in range(size) if indegree[i]) if visited < size else []
+    # -Compare against the calculator for the sold (or target) rates
+    needed: dict[str, float] = {}
+    for name, rate in (targets or sold).items():
+        if name not in recipes:
+            continue
+        for item, total in calculator.get_machine_totals(name, rate).items():
+            needed[item] = needed.get(item, 0.0) + total['count']
+    built: dict[str, int] = {}
+    for node in nodes.values():
+        if node['recipe'] is not None:
+            built[node['recipe']] = built.get(node['recipe'], 0) + 1
+    over_provisioned = {
+        name: {'needed': needed.get(name, 0.0), 'built': count}
+        for name, count in built.items()
+        if count > math.ceil(round(needed.get(name, 0.0), 9))
+    }
+    starved = sorted(
+        position for position, node in nodes.items()
+        if node['kind'] != KIND_NAMES[PRODUCER]
+        and node['utilization'] < 1.0 - tolerance and node['limited_by'] != 'capacity'
+    )
+    analysis: dict[str, Any] = {
+        'nodes': nodes,
+        'sold': sold,
+        'needed': needed,
+        'built': built,
+        'starved': starved,
+        'over_provisioned': over_provisioned,
+        'cycles': cycles,
+    }
+    if targets is not None:
+        analysis['targets'] = {
+            name: {'target': rate, 'actual': sold.get(name, 0.0)}
+            for name, rate in targets.items()
+        }
+        analysis['meets_targets'] = all(
+            sold.get(name, 0.0) >= rate * (1.0 - tolerance) for name, rate in targets.items()
+        )
+    return analysis
+
+
+def join_machine_totals(
+    floor: Floor, item: str, rate: float, resources: Any = None
+) -> dict[str, dict[str, Any]]:
+    """
+    Joins calculator.get_machine_totals for an item against what a floor has built
+        resources: calculator.ResourceTable to map names to ids (default: calculator.RESOURCES)
+        Gets recipe name -> rate/machine/count plus the positions of the entities making it
+        and how many of it sit in transformer queues
+    """
+    import calculator
+    resources = calculator.RESOURCES if resources is None else resources
+    ids = resources.ids
+    queued = get_queued_resources(floor, resources)
+    joined: dict[str, dict[str, Any]] = {}
+    for name, total in calculator.get_machine_totals(item, rate).items():
+        _id = ids.get(name)
+        positions = set(floor.positions_of_resource(_id)) if _id is not None else set()
+        joined[name] = dict(total, positions=positions, built=len(positions), queued=queued.get(name, 0))
+    return joined
+
+
+def get_queued_resources(floor: Floor, resources: Any = None) -> dict[str, int]:
+    """Counts the resources waiting in transformer queues by recipe name (queues are (resource, count) runs)"""
+    import calculator
+    names = (calculator.RESOURCES if resources is None else resources).names
+    queued: dict[str, int] = {}
+    for chunk in floor:
+        for _, entity in chunk.tiles():
+            component = entity.component
+            if not isinstance(component, QueueComponent):
+                continue
+            for resource_id, count in component.queue:
+                name = names[resource_id] if 0 <= resource_id < len(names) else None
+                if name is not None:
+                    queued[name] = queued.get(name, 0) + count
+    return queued
+
+
+def _get_conversions(recipes: Mapping[str, dict[str, Any]]) -> dict[tuple[str, str], tuple[str, int]]:
+    """
+    Gets (machine, input) -> (output, quantity) for every single input recipe
+    """
+    conversions: dict[tuple[str, str], tuple[str, int]] = {}
+    for output, recipe in recipes.items():
+        inputs = recipe.get('inputs', {})
+        if len(inputs) == 1:
+            (name, quantity), = inputs.items()
+            conversions.setdefault((recipe['machine'], name), (output, quantity))
+    return conversions
+
+
+def _solve_node(
+    kind: int, entity: Any, inflow: dict[str, float],
+    names: Mapping[int, str], machines: Mapping[int, str],
+    recipes: Mapping[str, dict[str, Any]],
+    conversions: dict[tuple[str, str], tuple[str, int]],
+    factors: Callable[[str], tuple[float, float]],
+) -> dict[str, Any]:
+    """
+    Gets a node's capacity/throughput/utilization and what it outputs for its inflow
+        factors: item -> (machines per item/sec, crafts per item/sec)
+        limited_by is 'capacity', the input that ran short, or None when nothing flowed
+    """
+    node: dict[str, Any] = {
+        'kind': KIND_NAMES[kind], 'recipe': None, 'capacity': math.inf,
+        'throughput': 0.0, 'utilization': 0.0, 'limited_by': None,
+        'inflow': inflow, 'outflow': {}, 'excess': {},
+    }
+    if kind in (CONVEYOR, SELLER):
+        node['outflow'] = dict(inflow)
+        node['throughput'] = sum(inflow.values())
+        return node
+    component = entity.component
+    if kind == PRODUCER:
+        name = names.get(component.resource_id)
+        node['recipe'] = name
+        if name is None:
+            return node
+        if component.timer:
+            capacity = 1.0 / component.timer
+        else:
+            capacity = 1.0 / factors(name)[0] if name in recipes else 1.0
+        node.update(capacity=capacity, throughput=capacity, utilization=1.0, limited_by='capacity')
+        node['outflow'] = {name: capacity}
+        return node
+    if kind == TRANSFORMER:
+        machine = machines.get(entity.id)
+        if machine is None:
+            # -Unknown machine: nothing to convert with, items pass through unchanged
+            node['outflow'] = dict(inflow)
+            node['throughput'] = sum(inflow.values())
+            return node
+        # -Mixed inputs share the machine's time: load is the machine time the inflow asks for
+        crafts: dict[str, tuple[str, float]] = {}
+        load = 0.0
+        for name, rate in inflow.items():
+            if (machine, name) in conversions:
+                output, quantity = conversions[machine, name]
+                machines_per, crafts_per = factors(output)
+                items = rate / (quantity * crafts_per)
+                crafts[name] = (output, items)
+                load += items * machines_per
+            else:
+                node['excess'][name] = rate
+        scale = min(1.0, 1.0 / load) if load > EPSILON else 0.0
+        outputs = {output for output, _ in crafts.values()}
+        node['recipe'] = outputs.pop() if len(outputs) == 1 else None
+        for name, (output, items) in crafts.items():
+            node['outflow'][output] = node['outflow'].get(output, 0.0) + items * scale
+            if scale < 1.0:
+                node['excess'][name] = inflow[name] * (1.0 - scale)
+        throughput = sum(items for _, items in crafts.values()) * scale
+        utilization = load * scale
+        capacity = throughput / utilization if utilization > EPSILON else (
+            1.0 / factors(node['recipe'])[0] if node['recipe'] is not None else math.inf
+        )
+        node.update(capacity=capacity, throughput=throughput, utilization=utilization)
+        node['limited_by'] = 'capacity' if utilization >= 1.0 - EPSILON else (
+            next(iter(crafts)) if crafts else None
+        )
+        return node
+    # -Crafter
+    name = names.get(component.resource_id)
+    node['recipe'] = name
+    if name is None or name not in recipes:
+        node['excess'] = dict(inflow)
+        return node
+    recipe = recipes[name]
+    machines_per, crafts_per = factors(name)
+    capacity = 1.0 / machines_per
+    throughput = capacity
+    limited_by = 'capacity'
+    for item, quantity in recipe.get('inputs', {}).items():
+        available = inflow.get(item, 0.0) / (quantity * crafts_per)
+        if available < throughput - EPSILON:
+            throughput, limited_by = available, item
+    for item, rate in inflow.items():
+        used = throughput * recipe.get('inputs', {}).get(item, 0) * crafts_per
+        if rate - used > EPSILON:
+            node['excess'][item] = rate - used
+    node.update(
+        capacity=capacity, throughput=throughput,
+        utilization=throughput / capacity, limited_by=limited_by,
+    )
+    node['outflow'] = {name: throughput} if throughput > EPSILON else {}
+    return node
@@ -7,51 +7,57 @@
 ##-------------------------------##
 
 ## Imports
+from __future__ import annotations
 import json
-from collections.abc import Iterable
+import os
+import queue
+import re
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 from .chunk import Chunk
 from .entity import (
-    Entity,
+    Entity, EntityComponent,
     CrafterComponent, ProducerComponent, QueueComponent, TransporterComponent,
 )
 from .floor import Floor
 from .world import World
+if TYPE_CHECKING:
+    from .tracking import ChunkDumps
+
+## Constants
+BATCH_SIZE: int = 512
+READ_SIZE: int = 1 << 16
+STREAM_SIZE: int = 1 << 23  # -Files larger than this are decoded incrementally
+_DECODER = json.JSONDecoder()
+_NUMBER_PARTS = frozenset('0123456789+-.eE')
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
 
 
 ## Functions
-def load_floor(path: Path) -> Floor:
+def load_floor(
+    path: Path, chunk_type: type[Chunk] = Chunk,
+    workers: int | None = None, report: dict[str, dict[str, Any]] | None = None,
+) -> Floor:
     """
+    Loads a floor save directory (or a binary snapshot file, see editor.snapshot)
+        chunk_type: Chunk backend to build, ArrayChunk for compact storage
+        workers: threads parsing the per-kind entity files concurrently
+        report: filled with per-file parse/place seconds and entity counts
+    Entity records are streamed in batches and placed on the floor as they arrive;
+    the first bad file cancels the remaining parsers and raises
+    While instrumentation.STATS is enabled the report is also added to it
     """
-    # -Internal Functions
-    def _build_inventory(entity_data: dict[str, Any]) -> set[tuple[int, int]]:
-        '''
-        '''
-        inventory = set()
-        for resource in entity_data['Inventory']['Resources']:
-            inventory.add((resource['ResourceType'], resource['Quantity']))
-        return inventory
-    def _build_queue(entity_data: dict[str, Any]) -> list[tuple[int, int]]:
-        '''
-        '''
-        current = None
-        queue = []
-        for resource in entity_data['Queue']["Resources"]:
-            resource_id = resource['ResourceType']
-            if current is None:
-                current = [resource_id, 1]
-            elif resource_id != current[0]:
-                queue.append(tuple(current))
-                current = [resource_id, 1]
-            else:
-                current[1] += 1
-        if current is not None:
-            queue.append(tuple(current))
-        return queue
-    # -Body
-    floor = Floor()
-    # --Chunks
+    from instrumentation import STATS
+    load_start = time.perf_counter()
+    if path.is_file():
+        from .snapshot import load_snapshot
+        return load_snapshot(path)
+    floor = Floor(chunk_type)
+    # -Chunks
     with open(path / "spaces.json") as f:
         chunks = json.load(f)
     for y, x_chunks in enumerate(chunks):
@@ -59,61 +65,433 @@ def load_floor(path: Path) -> Floor:
             if not bool(enabled):
                 continue
             floor.enable_chunk(x, y)
-    # --Starters
-    for entity, data in _load_entities(path / "starters.json", floor):
-        entity.component = ProducerComponent(data['ResourceType'])
-    # --Importers
-    for entity, data in _load_entities(path / "importers.json", floor):
-        entity.component = ProducerComponent(data['Resource'], data['SelectedTime'])
-    # --Rollers
-    all(_load_entities(path / "rollers.json", floor))
-    # --Sellers
-    all(_load_entities(path / "sellers.json", floor))
-    # --TODO: Selectors
-    for entity, data in _load_entities(path / "selectors.json", floor):
-        print(data)
-    # --Transporters
-    for entity, data in _load_entities(path / "transporter_inputs.json", floor):
-        entity.component = TransporterComponent(data['TransporterLineId'])
-    for entity, data in _load_entities(path / "transporter_outputs.json", floor):
-        entity.component = TransporterComponent(data['TransporterLineId'])
-    # --Splitters[Basic]
-    all(_load_entities(path / "splitters.json", floor))
-    # --Splitters[Advanced]
-    # --Splitters[Timer]
-    # --Transformers[Basic]
-    for entity, data in _load_entities(path / "transformers.json", floor):
-        queue = _build_queue(data)
-        entity.component = QueueComponent(queue)
-    # --Transformers[Advanced]
-    for entity, data in _load_entities(path / "quantity_transformers.json", floor):
-        queue = _build_queue(data)
-        entity.component = QueueComponent(queue)
-    # --Crafters[Basic]
-    for entity, data in _load_entities(path / "crafters.json", floor):
-        resource = data['BlueprintResult'] if data['BlueprintResult'] >= 0 else None
-        inventory = _build_inventory(data)
-        entity.component = CrafterComponent(resource, inventory)
-    # --Crafters[Advanced]
-    for entity, data in _load_entities(path / "radioactive_crafters.json", floor):
-        resource = data['BlueprintResult'] if data['BlueprintResult'] >= 0 else None
-        inventory = _build_inventory(data)
-        entity.component = CrafterComponent(resource, inventory, data['Energy'])
+    # -Entities
+    if report is None:
+        report = {}
+    records: queue.Queue = queue.Queue(maxsize=max(len(ENTITY_FILES), 16))
+    cancel = threading.Event()
+    def _put(message: tuple[str, str, Any]) -> None:
+        '''
+        '''
+        while not cancel.is_set():
+            try:
+                records.put(message, timeout=0.05)
+                return
+            except queue.Full:
+                continue
+    def _parse(file: str) -> None:
+        '''
+        '''
+        start = time.perf_counter()
+        try:
+            batch: list[dict[str, Any]] = []
+            for entity_data in _iter_json_array(path / file):
+                if cancel.is_set():
+                    return
+                batch.append(entity_data)
+                if len(batch) >= BATCH_SIZE:
+                    _put(('batch', file, batch))
+                    batch = []
+            if batch:
+                _put(('batch', file, batch))
+        except Exception as e:
+            _put(('error', file, e))
+            return
+        _put(('done', file, time.perf_counter() - start))
+    with floor.untracked(), ThreadPoolExecutor(max_workers=workers or min(4, len(ENTITY_FILES))) as executor:
+        for file in ENTITY_FILES:
+            report[file] = {'parse': 0.0, 'place': 0.0, 'entities': 0}
+            executor.submit(_parse, file)
+        remaining = len(ENTITY_FILES)
+        try:
+            while remaining:
+                kind, file, value = records.get()
+                if kind == 'error':
+                    raise ValueError(f"Save file '{path / file}' not valid: {value}") from value
+                elif kind == 'done':
+                    report[file]['parse'] = value
+                    remaining -= 1
+                    continue
+                start = time.perf_counter()
+                build_component = ENTITY_FILES[file][0]
+                for entity_data in value:
+                    component = build_component(entity_data) if build_component is not None else None
+                    _place_entity(entity_data, floor, component)
+                    floor.entity_files.setdefault(entity_data['Type'], file)
+                report[file]['place'] += time.perf_counter() - start
+                report[file]['entities'] += len(value)
+        finally:
+            cancel.set()
+    if STATS.enabled:
+        for file, entry in report.items():
+            STATS.record(f"editor.load_floor.parse[{file}]", entry['parse'])
+            STATS.record(f"editor.load_floor.place[{file}]", entry['place'])
+            STATS.count(f"editor.load_floor.entities[{file}]", entry['entities'])
+        STATS.record("editor.load_floor", time.perf_counter() - load_start)
     return floor
 
 
-def _load_entities(file: Path, floor: Floor) -> Iterable[Entity, dict[str, Any]]:
+def load_world(path: Path, workers: int | None = None, stats: dict[str, Any] | None = None) -> World:
+    """
+    Loads every floor of a world save (see find_floors) in parallel
+        workers: processes loading floors (default: cpu count, 0 loads in this process)
+        stats: filled with per-floor statistics under 'floors' and their sums
+        (chunks, entities by type id, producers by resource id)
+    Workers parse a floor and send it back as a compact snapshot along with its statistics,
+    the floors of the world are snapshot backed and only decode the chunks that get touched
+    """
+    from .snapshot import load_snapshot
+    floors = find_floors(path)
+    if not floors:
+        raise ValueError(f"World save '{path}' has no floors")
+    if stats is None:
+        stats = {}
+    stats.update(floors={}, chunks=0, entities={}, producers={})
+    world = World()
+
+    def _add_floor(index: int, snapshot: bytes, floor_stats: dict[str, Any]) -> None:
+        '''
+        '''
+        world[index] = load_snapshot(snapshot)
+        stats['floors'][index] = floor_stats
+        stats['chunks'] += floor_stats['chunks']
+        for key in ('entities', 'producers'):
+            for _id, count in floor_stats[key].items():
+                stats[key][_id] = stats[key].get(_id, 0) + count
+
+    if workers == 0 or len(floors) == 1:
+        for index, floor_path in floors.items():
+            _add_floor(index, *_load_world_floor(floor_path))
+        return world
+    workers = min(workers or os.cpu_count() or 1, len(floors))
+    with ProcessPoolExecutor(workers) as executor:
+        for index, result in zip(floors, executor.map(_load_world_floor, floors.values())):
+            _add_floor(index, *result)
+    return world
+
+
+def find_floors(path: Path) -> dict[int, Path]:
+    """
+    Finds the floor save directories of a world save
+        The directory itself is floor 0 when it holds a spaces.json, else every subdirectory
+        that does is a floor, numbered by the digits its name ends in (else after the highest)
+    """
+    if (path / "spaces.json").is_file():
+        return {0: path}
+    floors: dict[int, Path] = {}
+    unnumbered: list[Path] = []
+    for directory in sorted(path.iterdir()):
+        if not (directory / "spaces.json").is_file():
+            continue
+        number = re.search(r'(\d+)$', directory.name)
+        if number is None or int(number.group(1)) in floors:
+            unnumbered.append(directory)
+        else:
+            floors[int(number.group(1))] = directory
+    for directory in unnumbered:
+        floors[max(floors, default=-1) + 1] = directory
+    return dict(sorted(floors.items()))
+
+
+def get_floor_stats(floor: Floor) -> dict[str, Any]:
+    """
+    Gets the chunk count, entities by type id and producers by resource id of a floor
+    """
+    entities: dict[int, int] = {}
+    producers: dict[int, int] = {}
+    for chunk in floor:
+        for entity in chunk:
+            entities[entity.id] = entities.get(entity.id, 0) + 1
+            component = entity.component
+            if isinstance(component, ProducerComponent) and component.resource_id is not None:
+                producers[component.resource_id] = producers.get(component.resource_id, 0) + 1
+    return {'chunks': floor.chunk_count, 'entities': entities, 'producers': producers}
+
+
+def save_floor(floor: Floor, path: Path, dumps: ChunkDumps | None = None) -> None:
+    """
+    Writes a floor back out as a save directory (spaces.json + one json file per entity kind)
+        Entities go to the file they were loaded from, else one inferred from their component
+        dumps: tracking.ChunkDumps of the floor, only chunks edited since the last save are redone
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    # -Chunks
+    spaces = [[0 for x in range(Floor.Size)] for y in range(Floor.Size)]
+    for chunk in floor:
+        if not (0 <= chunk.x < Floor.Size and 0 <= chunk.y < Floor.Size):
+            raise ValueError(f"{chunk} outside the {Floor.Size}x{Floor.Size} save layout")
+        spaces[chunk.y][chunk.x] = 1
+    _write_json(path / "spaces.json", lambda f: json.dump(spaces, f))
+    # -Entities
+    entities: dict[str, list[dict[str, Any]]] = {file: [] for file in ENTITY_FILES}
+    if dumps is not None:
+        dumps.update()
+        chunk_dumps = dumps.values.values()
+    else:
+        chunk_dumps = (dump_chunk(floor, chunk) for chunk in floor)
+    for chunk_dump in chunk_dumps:
+        for file, data in chunk_dump.items():
+            entities[file].extend(data)
+    for file, data in entities.items():
+        _write_json(path / file, lambda f: json.dump(data, f))
+
+
+def dump_chunk(floor: Floor, chunk: Chunk) -> dict[str, list[dict[str, Any]]]:
+    """
+    Gets the save file records of a chunk's entities by save file
+    """
+    entities: dict[str, list[dict[str, Any]]] = {}
+    for (x, y), entity in chunk.tiles():
+        file = _get_entity_file(floor, entity)
+        entity_data: dict[str, Any] = {
+            'Type': entity.id,
+            'Direction': entity.direction,
+            'Position': [float(chunk.x_offset + x), float(chunk.y_offset + y)],
+        }
+        dump_component = ENTITY_FILES[file][1]
+        if dump_component is not None and entity.component is not None:
+            entity_data.update(dump_component(entity.component))
+        entities.setdefault(file, []).append(entity_data)
+    return entities
+
+
+def _write_json(file: Path, write: Callable[[Any], None]) -> None:
+    """
+    Writes a file through a temporary sibling so a failed save never truncates the old one
+    """
+    temporary = file.with_name(file.name + ".tmp")
+    with open(temporary, 'w') as f:
+        write(f)
+    os.replace(temporary, file)
+
+
+def _get_entity_file(floor: Floor, entity: Entity) -> str:
+    """
+    Gets the save file an entity belongs in
+    """
+    file = floor.entity_files.get(entity.id)
+    if file is not None:
+        return file
+    component = entity.component
+    if isinstance(component, ProducerComponent):
+        return "starters.json" if component.timer is None else "importers.json"
+    elif isinstance(component, CrafterComponent):
+        return "crafters.json" if component.energy is None else "radioactive_crafters.json"
+    elif isinstance(component, QueueComponent):
+        return "transformers.json"
+    raise ValueError(f"Save file for entity type '{entity.id}' not known")
+
+
+def _load_world_floor(path: Path) -> tuple[bytes, dict[str, Any]]:
+    """
+    Loads one floor of a world (in a worker), gets its snapshot bytes and statistics
+    """
+    from .snapshot import pack_snapshot
+    floor = load_floor(path)
+    return (pack_snapshot(floor), get_floor_stats(floor))
+
+
+def _load_entities(file: Path, floor: Floor) -> Iterable[tuple[Entity, dict[str, Any]]]:
+    """
+    Streams the entities of a single save file onto a floor
+    """
+    for entity_data in _iter_json_array(file):
+        yield (_place_entity(entity_data, floor), entity_data)
+
+
+def _place_entity(entity_dict: dict[str, Any], floor: Floor, component: EntityComponent | None = None) -> Entity:
+    """
+    Builds an entity record and places it in its chunk
+    """
+    entity = Entity(entity_dict['Type'], entity_dict['Direction'])
+    entity.component = component
+    x, y = entity_dict['Position']
+    x, y = (int(x), int(y))
+    offset_x, offset_y = (x % Chunk.Size, y % Chunk.Size)
+    chunk = floor.get_chunk_from_world_coordinates(x, y)
+    if chunk is None:
+        raise ValueError(f"Entity position ({x}, {y}) not in an enabled chunk")
+    chunk[offset_x, offset_y] = entity
+    # -Array backed chunks hand back a view, so components set later land in the chunk
+    return chunk[offset_x, offset_y]
+
+
+def _iter_json_array(file: Path, read_size: int = READ_SIZE, stream_size: int = STREAM_SIZE) -> Iterator[Any]:
     """
+    Decodes the elements of a top-level json array
+        Files above stream_size are decoded incrementally, holding only the current read window
     """
-    # -Internal Functions
-    def _load_entity(entity_dict: dict[str, Any]) -> Entity:
-        entity = Entity(entity_dict['Type'], entity_dict['Direction'])
-        x, y = (int(i) for i in entity_dict['Position'])
-        offset_x, offset_y = (x % Chunk.Size, y % Chunk.Size)
-        chunk = floor.get_chunk_from_world_coordinates(x, y)
-        chunk[offset_x, offset_y] = entity
-        return entity
-    # -Body
+    if file.stat().st_size <= stream_size:
+        with open(file) as f:
+            elements = json.load(f)
+        if not isinstance(elements, list):
+            raise ValueError(f"Expected '[' at start of '{file}'")
+        yield from elements
+        return
     with open(file) as f:
-        for entity_data in json.load(f):
-            yield (_load_entity(entity_data), entity_data)
+        buffer = ''
+        position = 0
+        eof = False
+        def _read() -> None:
+            '''
+            '''
+            nonlocal buffer, position, eof
+            data = f.read(read_size)
+            eof = not data
+            buffer = buffer[position:] + data
+            position = 0
+        def _skip() -> str:
+            '''Skips whitespace and gets the next character ('' at end of file)'''
+            nonlocal position
+            while True:
+                position = _WHITESPACE.match(buffer, position).end()
+                if position < len(buffer) or eof:
+                    return buffer[position:position + 1]
+                _read()
+        _read()
+        if _skip() != '[':
+            raise ValueError(f"Expected '[' at start of '{file}'")
+        position += 1
+        if _skip() == ']':
+            position += 1
+        else:
+            while True:
+                # -Element, reading more until it fully decodes
+                _skip()
+                while True:
+                    try:
+                        element, end = _DECODER.raw_decode(buffer, position)
+                        # -A number can go on past the window ("12." of "12.5")
+                        if eof or (end < len(buffer) and buffer[end] not in _NUMBER_PARTS):
+                            break
+                    except json.JSONDecodeError:
+                        if eof:
+                            raise
+                    _read()
+                position = end
+                yield element
+                # -Separator
+                separator = _skip()
+                position += 1
+                if separator == ']':
+                    break
+                elif separator != ',':
+                    raise ValueError(f"Expected ',' or ']' in '{file}', got '{separator}'")
+        if _skip() != '':
+            raise ValueError(f"Unexpected data after array in '{file}'")
+
+
+def _build_inventory(entity_data: dict[str, Any]) -> set[tuple[int, int]]:
+    """
+    """
+    inventory = set()
+    for resource in entity_data['Inventory']['Resources']:
+        inventory.add((resource['ResourceType'], resource['Quantity']))
+    return inventory
+
+
+def _build_queue(entity_data: dict[str, Any]) -> list[tuple[int, int]]:
+    """
+    """
+    current = None
+    queue = []
+    for resource in entity_data['Queue']["Resources"]:
+        resource_id = resource['ResourceType']
+        if current is None:
+            current = [resource_id, 1]
+        elif resource_id != current[0]:
+            queue.append(tuple(current))
+            current = [resource_id, 1]
+        else:
+            current[1] += 1
+    if current is not None:
+        queue.append(tuple(current))
+    return queue
+
+
+def _build_starter(data: dict[str, Any]) -> EntityComponent:
+    return ProducerComponent(data['ResourceType'])
+
+
+def _build_importer(data: dict[str, Any]) -> EntityComponent:
+    return ProducerComponent(data['Resource'], data['SelectedTime'])
+
+
+def _build_selector(data: dict[str, Any]) -> None:
+    # -TODO: Selectors
+    print(data)
+
+
+def _build_transporter(data: dict[str, Any]) -> EntityComponent:
+    return TransporterComponent(data['TransporterLineId'])
+
+
+def _build_transformer(data: dict[str, Any]) -> EntityComponent:
+    return QueueComponent(_build_queue(data))
+
+
+def _build_crafter(data: dict[str, Any]) -> EntityComponent:
+    resource = data['BlueprintResult'] if data['BlueprintResult'] >= 0 else None
+    return CrafterComponent(resource, _build_inventory(data))
+
+
+def _build_radioactive_crafter(data: dict[str, Any]) -> EntityComponent:
+    resource = data['BlueprintResult'] if data['BlueprintResult'] >= 0 else None
+    return CrafterComponent(resource, _build_inventory(data), data['Energy'])
+
+
+def _dump_starter(component: ProducerComponent) -> dict[str, Any]:
+    return {'ResourceType': component.resource_id}
+
+
+def _dump_importer(component: ProducerComponent) -> dict[str, Any]:
+    return {'Resource': component.resource_id, 'SelectedTime': component.timer}
+
+
+def _dump_transporter(component: TransporterComponent) -> dict[str, Any]:
+    return {'TransporterLineId': component.id}
+
+
+def _dump_transformer(component: QueueComponent) -> dict[str, Any]:
+    resources = [
+        {'ResourceType': resource_id}
+        for resource_id, count in component.queue
+        for _ in range(count)
+    ]
+    return {'Queue': {'Resources': resources}}
+
+
+def _dump_crafter(component: CrafterComponent) -> dict[str, Any]:
+    resources = [
+        {'ResourceType': resource_id, 'Quantity': quantity}
+        for resource_id, quantity in sorted(component.inventory)
+    ]
+    return {
+        'BlueprintResult': component.resource_id if component.resource_id is not None else -1,
+        'Inventory': {'Resources': resources},
+    }
+
+
+def _dump_radioactive_crafter(component: CrafterComponent) -> dict[str, Any]:
+    entity_data = _dump_crafter(component)
+    entity_data['Energy'] = component.energy
+    return entity_data
+
+
+## Constants
+# -Save file -> (component builder, component dumper) (None=No component)
+ENTITY_FILES: dict[str, tuple[Callable[[dict[str, Any]], EntityComponent | None] | None, Callable[[Any], dict[str, Any]] | None]] = {
+    "starters.json": (_build_starter, _dump_starter),
+    "importers.json": (_build_importer, _dump_importer),
+    "rollers.json": (None, None),
+    "sellers.json": (None, None),
+    "selectors.json": (_build_selector, None),
+    "transporter_inputs.json": (_build_transporter, _dump_transporter),
+    "transporter_outputs.json": (_build_transporter, _dump_transporter),
+    # -Splitters[Basic]; TODO: Splitters[Advanced], Splitters[Timer]
+    "splitters.json": (None, None),
+    "transformers.json": (_build_transformer, _dump_transformer),
+    "quantity_transformers.json": (_build_transformer, _dump_transformer),
+    "crafters.json": (_build_crafter, _dump_crafter),
+    "radioactive_crafters.json": (_build_radioactive_crafter, _dump_radioactive_crafter),
+}
@@ -0,0 +1,385 @@
+#!/usr/bin/python
+##-------------------------------##
+## Assembly Line: Editor         ##
+## Written By: Ryan Smith        ##
+##-------------------------------##
+## Simulator                     ##
+##-------------------------------##
+
+## Imports
+from __future__ import annotations
+import math
+from collections.abc import Mapping
+from typing import Any
+import numpy
+from .chunk import Chunk
+from .entity import DIRECTIONS, CrafterComponent, Entity, ProducerComponent, QueueComponent
+from .floor import Floor
+
+## Constants
+# -Node kinds
+CONVEYOR, SELLER, PRODUCER, TRANSFORMER, CRAFTER = range(5)
+KIND_NAMES: tuple[str, ...] = ('conveyor', 'seller', 'producer', 'transformer', 'crafter')
+EMPTY: int = -1
+
+
+## Classes
+class FloorSimulation:
+    """
+    Tick based throughput simulation of a loaded floor
+        The floor is compiled once into a flat edge list (node -> node it outputs into) and
+        array state; every tick advances all nodes with a fixed number of vectorized steps
+    Model:
+        Every tile holds at most one item. Producers emit their resource every period,
+        conveyors (rollers/splitters/transporters/...) pass items on, transformers hold an
+        item for their craft time (optionally converting it), crafters collect recipe inputs
+        and emit their resource after their craft time, and sellers consume anything
+        A machine's resource is what it emits (transformers: the last resource they made)
+    """
+
+    # -Constructor
+    def __init__(
+        self, floor: Floor,
+        recipes: Mapping[int, Mapping[int, int]] | None = None,
+        transforms: Mapping[tuple[int, int], int] | None = None,
+        craft_times: Mapping[int, float] | None = None,
+        tick: float = 0.1, default_time: float = 1.0,
+        names: Mapping[int, str] | None = None,
+        machines: Mapping[int, str] | None = None,
+    ) -> None:
+        '''
+        recipes: crafter resource id -> {input resource id: count} (default: calculator.RECIPES)
+        transforms: (transformer type id, input resource id) -> output resource id
+            (default: the single input recipes of each transformer's machine)
+        craft_times: entity type id -> seconds per item/craft (producers use their timer first)
+        names: resource id -> calculator recipe name (default: calculator.RESOURCES)
+        machines: transformer type id -> calculator machine name (wire, cutter, ...)
+        Machines without a craft time take theirs from the calculator like flow.analyze_floor
+        (producers/crafters: get_item_factors of their resource, transformers: their machine's
+        time at its speed) and fall back to default_time
+        '''
+        import calculator
+        names = calculator.RESOURCES if names is None else names
+        machines = machines or {}
+        self.tick: float = tick
+        self.ticks: int = 0
+        if recipes is None or transforms is None:
+            default_recipes, default_transforms = _get_recipe_tables(calculator.RECIPES.recipes, names, machines)
+            recipes = default_recipes if recipes is None else recipes
+            transforms = default_transforms if transforms is None else transforms
+        craft_times = craft_times or {}
+        # -Nodes
+        self.positions, entities, kinds, targets = compile_floor(floor)
+        size = len(entities)
+        self.size: int = size
+        self.kind = numpy.array(kinds, dtype=numpy.int8)
+        self.output = numpy.full(size, EMPTY, dtype=numpy.int64)
+        self.period = numpy.ones(size, dtype=numpy.int64)
+        for i, entity in enumerate(entities):
+            if kinds[i] < PRODUCER:
+                continue
+            component = entity.component
+            if kinds[i] in (PRODUCER, CRAFTER):
+                self.output[i] = component.resource_id if component.resource_id is not None else EMPTY
+            if kinds[i] == PRODUCER and component.timer:
+                seconds = component.timer
+            elif entity.id in craft_times:
+                seconds = craft_times[entity.id]
+            elif kinds[i] == TRANSFORMER:
+                machine = machines.get(entity.id)
+                if machine in calculator.MACHINES:
+                    seconds = calculator.MACHINES[machine] / calculator.get_machine_speed(machine)
+                else:
+                    seconds = default_time
+            else:
+                name = names.get(component.resource_id)
+                seconds = calculator.get_item_factors(name)[0] if name in calculator.RECIPES else default_time
+            self.period[i] = max(1, round(seconds / tick))
+        self.target = numpy.array(targets + [EMPTY], dtype=numpy.intp)
+        self.target[self.target == EMPTY] = size  # -size=Sentinel (no target)
+        self.types = numpy.array([entity.id for entity in entities], dtype=numpy.int64)
+        # -Transforms: sorted (type, input) keys for vectorized lookup
+        keys = sorted(transforms)
+        self._transform_keys = numpy.array([_id * (1 << 32) + resource for _id, resource in keys], dtype=numpy.int64)
+        self._transform_values = numpy.array([transforms[key] for key in keys], dtype=numpy.int64)
+        # -Crafters: one row of (input resource, needed, held) per crafter
+        self.crafters = numpy.flatnonzero(self.kind == CRAFTER)
+        self.crafter_row = numpy.full(size + 1, EMPTY, dtype=numpy.intp)
+        self.crafter_row[self.crafters] = numpy.arange(len(self.crafters))
+        width = max((len(recipes.get(int(self.output[i]), {})) for i in self.crafters), default=0) or 1
+        self.inputs = numpy.full((len(self.crafters), width), EMPTY, dtype=numpy.int64)
+        self.needed = numpy.zeros((len(self.crafters), width), dtype=numpy.int64)
+        self.has_recipe = numpy.zeros(len(self.crafters), dtype=bool)
+        for row, i in enumerate(self.crafters):
+            recipe = recipes.get(int(self.output[i]))
+            if not recipe:
+                continue
+            self.has_recipe[row] = True
+            for column, (resource, count) in enumerate(recipe.items()):
+                self.inputs[row, column] = resource
+                self.needed[row, column] = count
+        self.held = numpy.zeros_like(self.needed)
+        self.crafting = numpy.zeros(len(self.crafters), dtype=bool)
+        # -Node subsets stepped every tick
+        self.machines = numpy.flatnonzero(self.kind >= PRODUCER)
+        self.producers = numpy.flatnonzero((self.kind == PRODUCER) & (self.output != EMPTY))
+        self.transformers = numpy.flatnonzero(self.kind == TRANSFORMER)
+        self.target_kind = numpy.append(self.kind, PRODUCER)[self.target[:size]]
+        self.movable = (self.target_kind != PRODUCER) & (self.kind != SELLER)
+        # -State
+        self.slot = numpy.full(size + 1, EMPTY, dtype=numpy.int64)
+        self.timer = numpy.zeros(size, dtype=numpy.int64)
+        self.sold: dict[tuple[int, int], int] = {}
+        self.busy_ticks = numpy.zeros(len(self.machines), dtype=numpy.int64)
+        self.blocked_ticks = numpy.zeros(len(self.machines), dtype=numpy.int64)
+        self.starved_ticks = numpy.zeros(len(self.machines), dtype=numpy.int64)
+
+    # -Instance Methods
+    def run(self, ticks: int) -> dict[str, Any]:
+        '''Advances the simulation by a number of ticks and gets the results so far'''
+        for _ in range(ticks):
+            self.step()
+        return self.results()
+
+    def step(self) -> None:
+        '''Advances the simulation by a single tick'''
+        size = self.size
+        slot = self.slot[:size]
+        target = self.target[:size]
+        timer = self.timer
+        # -Machines: count down, producers emit, crafters finish
+        numpy.subtract(timer, 1, out=timer, where=timer > 0)
+        producers = self.producers
+        producers = producers[(timer[producers] == 0) & (slot[producers] == EMPTY)]
+        slot[producers] = self.output[producers]
+        timer[producers] = self.period[producers]
+        finished = self.crafting & (timer[self.crafters] == 0)
+        slot[self.crafters[finished]] = self.output[self.crafters[finished]]
+        self.crafting[finished] = False
+        # -Movement sources: items ready to leave
+        ready = self.movable & (slot != EMPTY)
+        ready[self.transformers[timer[self.transformers] > 0]] = False
+        sources = numpy.flatnonzero(ready)
+        target_kind = self.target_kind[sources]
+        # -Crafters only take inputs they still need
+        into_crafter = numpy.flatnonzero(target_kind == CRAFTER)
+        needed_column = numpy.full(len(sources), EMPTY, dtype=numpy.intp)
+        if len(into_crafter):
+            rows = self.crafter_row[target[sources[into_crafter]]]
+            items = slot[sources[into_crafter]]
+            wanted = (self.inputs[rows] == items[:, None]) & (self.held[rows] < self.needed[rows])
+            needed_column[into_crafter] = numpy.where(wanted.any(axis=1), wanted.argmax(axis=1), EMPTY)
+            allowed = numpy.flatnonzero((target_kind != CRAFTER) | (needed_column != EMPTY))
+            sources, target_kind, needed_column = sources[allowed], target_kind[allowed], needed_column[allowed]
+        # -One source per target, alternating priority between ticks
+        source_targets = target[sources]
+        order = slice(None, None, -1) if self.ticks % 2 else slice(None)
+        _, first = numpy.unique(source_targets[order], return_index=True)
+        winners = numpy.arange(len(sources))[order][first]
+        sources, source_targets = sources[winners], source_targets[winners]
+        target_kind, needed_column = target_kind[winners], needed_column[winners]
+        # -Resolve chains: a source moves if its target accepts locally, or moves on itself
+        #  Pointer jumping settles every chain in log2 steps; whatever is still pending after
+        #  that sits on a full loop (nothing in it can move) and stays blocked
+        accepts = (
+            (target_kind == SELLER) | (target_kind == CRAFTER)
+            | ((slot[source_targets] == EMPTY) & ~((target_kind == TRANSFORMER) & (timer[source_targets] > 0)))
+        )
+        source_of = numpy.full(size + 1, len(sources), dtype=numpy.intp)
+        source_of[sources] = numpy.arange(len(sources))
+        resolved = numpy.append(accepts, False)
+        pending = numpy.append(~accepts, False)
+        following = numpy.append(source_of[source_targets], len(sources))
+        for _ in range(len(sources).bit_length() + 1):
+            if not pending.any():
+                break
+            resolved = resolved | (pending & resolved[following])
+            pending = pending & pending[following]
+            following = following[following]
+        moves = numpy.flatnonzero(resolved[:-1])
+        sources, source_targets = sources[moves], source_targets[moves]
+        target_kind, needed_column = target_kind[moves], needed_column[moves]
+        items = slot[sources]
+        # -Apply moves
+        slot[sources] = EMPTY
+        carried = (target_kind == CONVEYOR) | (target_kind == TRANSFORMER)
+        slot[source_targets[carried]] = items[carried]
+        transformed = target_kind == TRANSFORMER
+        if transformed.any():
+            into = source_targets[transformed]
+            slot[into] = self.output[into] = self._transform(self.types[into], items[transformed])
+            timer[into] = self.period[into]
+        crafted = target_kind == CRAFTER
+        if crafted.any():
+            numpy.add.at(self.held, (self.crafter_row[source_targets[crafted]], needed_column[crafted]), 1)
+        sold = target_kind == SELLER
+        for seller, item in zip(source_targets[sold].tolist(), items[sold].tolist()):
+            self.sold[seller, item] = self.sold.get((seller, item), 0) + 1
+        # -Crafters start once every input is held
+        idle = (
+            self.has_recipe & ~self.crafting
+            & (timer[self.crafters] == 0) & (slot[self.crafters] == EMPTY)
+            & (self.held >= self.needed).all(axis=1)
+        )
+        if idle.any():
+            self.held[idle] -= self.needed[idle]
+            self.crafting[idle] = True
+            timer[self.crafters[idle]] = self.period[self.crafters[idle]]
+        # -Statistics: idle machines either still hold their output (blocked) or wait for input
+        busy = timer[self.machines] > 0
+        holding = slot[self.machines] != EMPTY
+        self.busy_ticks += busy
+        self.blocked_ticks += ~busy & holding
+        self.starved_ticks += ~busy & ~holding
+        self.ticks += 1
+
+    def results(self, busy_threshold: float = 0.95, blocked_threshold: float = 0.05) -> dict[str, Any]:
+        '''
+        Gets simulated items/sec per seller and resource plus per machine utilization
+            Bottlenecks are machines running flat out while their output still flows
+        '''
+        seconds = self.ticks * self.tick
+        sellers: dict[tuple[int, int], dict[int, float]] = {}
+        resources: dict[int, float] = {}
+        for (seller, item), count in self.sold.items():
+            rate = count / seconds if seconds else 0.0
+            sellers.setdefault(self.positions[seller], {})[item] = rate
+            resources[item] = resources.get(item, 0.0) + rate
+        machines: dict[tuple[int, int], dict[str, Any]] = {}
+        bottlenecks: list[tuple[float, tuple[int, int]]] = []
+        ticks = max(self.ticks, 1)
+        for row, i in enumerate(self.machines.tolist()):
+            busy = int(self.busy_ticks[row]) / ticks
+            blocked = int(self.blocked_ticks[row]) / ticks
+            machines[self.positions[i]] = {
+                'kind': KIND_NAMES[self.kind[i]],
+                'resource': int(self.output[i]) if self.output[i] != EMPTY else None,
+                'busy': busy, 'blocked': blocked,
+                'starved': int(self.starved_ticks[row]) / ticks,
+            }
+            if busy >= busy_threshold and blocked <= blocked_threshold:
+                bottlenecks.append((busy, self.positions[i]))
+        return {
+            'ticks': self.ticks,
+            'seconds': seconds,
+            'sellers': sellers,
+            'resources': resources,
+            'machines': machines,
+            'bottlenecks': [position for _, position in sorted(bottlenecks, reverse=True)],
+        }
+
+    def _transform(self, types: Any, items: Any) -> Any:
+        '''
+        '''
+        if not len(self._transform_keys):
+            return items
+        keys = types * (1 << 32) + items
+        found = numpy.searchsorted(self._transform_keys, keys)
+        found = numpy.minimum(found, len(self._transform_keys) - 1)
+        hit = self._transform_keys[found] == keys
+        return numpy.where(hit, self._transform_values[found], items)
+
+
+## Functions
+def compile_floor(floor: Floor) -> tuple[list[tuple[int, int]], list[Entity], list[int], list[int]]:
+    """
+    Flattens a floor into parallel node lists
+        Gets (world positions, entities, node kinds, index of the node each outputs into or EMPTY)
+    """
+    return link_nodes([node for chunk in floor for node in compile_chunk(floor, chunk)])
+
+
+def compile_chunk(floor: Floor, chunk: Chunk) -> list[tuple[tuple[int, int], Entity, int, tuple[int, int]]]:
+    """
+    Gets (world position, entity, node kind, world position it outputs into) of a chunk's tiles
+    """
+    nodes = []
+    for (x, y), entity in chunk.tiles():
+        x, y = (chunk.x_offset + x, chunk.y_offset + y)
+        component = entity.component
+        if floor.entity_files.get(entity.id) == "sellers.json":
+            kind = SELLER
+        elif isinstance(component, ProducerComponent):
+            kind = PRODUCER
+        elif isinstance(component, QueueComponent):
+            kind = TRANSFORMER
+        elif isinstance(component, CrafterComponent):
+            kind = CRAFTER
+        else:
+            kind = CONVEYOR
+        dx, dy = DIRECTIONS[entity.direction % len(DIRECTIONS)]
+        nodes.append(((x, y), entity, kind, (x + dx, y + dy)))
+    return nodes
+
+
+def link_nodes(
+    nodes: list[tuple[tuple[int, int], Entity, int, tuple[int, int]]]
+) -> tuple[list[tuple[int, int]], list[Entity], list[int], list[int]]:
+    """
+    Joins compiled chunk nodes into compile_floor's parallel lists
+    """
+    positions = [node[0] for node in nodes]
+    index = {position: i for i, position in enumerate(positions)}
+    return (
+        positions,
+        [node[1] for node in nodes],
+        [node[2] for node in nodes],
+        [index.get(node[3], EMPTY) for node in nodes],
+    )
+
+
+def _get_recipe_tables(
+    recipes: Mapping[str, dict[str, Any]], names: Mapping[int, str], machines: Mapping[int, str]
+) -> tuple[dict[int, dict[int, int]], dict[tuple[int, int], int]]:
+    """
+    Gets the (recipes, transforms) tables of FloorSimulation from calculator recipes
+        Recipes with an item that has no resource id are left out
+    """
+    ids = {name: _id for _id, name in names.items()}
+    tables: dict[int, dict[int, int]] = {}
+    conversions: dict[tuple[str, int], int] = {}
+    for output, recipe in recipes.items():
+        inputs = recipe.get('inputs')
+        if not inputs or output not in ids or any(name not in ids for name in inputs):
+            continue
+        tables[ids[output]] = {ids[name]: count for name, count in inputs.items()}
+        if len(inputs) == 1:
+            conversions.setdefault((recipe['machine'], ids[next(iter(inputs))]), ids[output])
+    transforms = {
+        (_id, resource): output
+        for _id, machine in machines.items()
+        for (convertor, resource), output in conversions.items() if convertor == machine
+    }
+    return (tables, transforms)
+
+
+def simulate_floor(floor: Floor, ticks: int = 1000, **kwargs: Any) -> dict[str, Any]:
+    """Compiles and runs a floor simulation, see FloorSimulation for the options"""
+    return FloorSimulation(floor, **kwargs).run(ticks)
+
+
+def compare_with_calculator(
+    results: dict[str, Any], names: Mapping[int, str] | None, item: int
+) -> dict[str, dict[str, float]]:
+    """
+    Checks a simulation against calculator.get_machine_totals for the simulated rate of an item
+        names: resource id -> calculator recipe name (None: calculator.RESOURCES)
+        Gets recipe name -> predicted machines/built machines for every item in the plan
+    """
+    import calculator
+    names = calculator.RESOURCES if names is None else names
+    rate = results['resources'].get(item, 0.0)
+    built: dict[str, int] = {}
+    for machine in results['machines'].values():
+        name = names.get(machine['resource'])
+        if name is not None:
+            built[name] = built.get(name, 0) + 1
+    comparison: dict[str, dict[str, float]] = {}
+    for name, total in calculator.get_machine_totals(names[item], rate).items():
+        comparison[name] = {
+            'rate': total['rate'],
+            'predicted': total['count'],
+            'built': built.get(name, 0),
+            'shortfall': max(0.0, math.ceil(round(total['count'], 9)) - built.get(name, 0)),
+        }
+    return comparison
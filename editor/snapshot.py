@@ -0,0 +1,249 @@
+#!/usr/bin/python
+##-------------------------------##
+## Assembly Line: Editor         ##
+## Written By: Ryan Smith        ##
+##-------------------------------##
+## Snapshot                      ##
+##-------------------------------##
+
+## Imports
+from __future__ import annotations
+import io
+import math
+import mmap
+import struct
+import weakref
+from pathlib import Path
+from typing import Any, BinaryIO
+from .chunk import Chunk
+from .entity import (
+    Entity, EntityComponent,
+    CrafterComponent, ProducerComponent, QueueComponent, TransporterComponent,
+)
+from .floor import Floor
+
+## Constants
+MAGIC: bytes = b"ALFS"
+VERSION: int = 1
+# -magic, version, chunk count, entity file count, tiles offset, pool offset
+HEADER = struct.Struct('<4sHIIII')
+# -type id, file name length
+FILE_ENTRY = struct.Struct('<iH')
+# -chunk x, chunk y
+CHUNK_ENTRY = struct.Struct('<ii')
+# -type id, flags, direction, component kind, resource/id, timer/energy, pool offset, pool count
+TILE = struct.Struct('<iBbBidII')
+# -resource id, quantity/count
+POOL_ENTRY = struct.Struct('<ii')
+CHUNK_BYTES: int = TILE.size * Chunk.Size * Chunk.Size
+# -Tile flags
+OCCUPIED: int = 1 << 0
+NO_RESOURCE: int = 1 << 1
+HAS_VALUE: int = 1 << 2
+# -Component kinds
+NO_COMPONENT, PRODUCER, CRAFTER, TRANSPORTER, QUEUE = range(5)
+
+
+## Classes
+class SnapshotChunk(Chunk):
+    """
+    Assembly Line 2 Floor Chunk (snapshot backed)
+        Tiles are decoded from the memory-mapped snapshot on first access
+    """
+
+    # -Constructor
+    def __init__(self, x_offset: int, y_offset: int, snapshot: Snapshot, index: int) -> None:
+        self.offset: tuple[int, int] = (x_offset, y_offset)
+        self.floor: Floor | None = None
+        self._snapshot: Snapshot = snapshot
+        self._index: int = index
+
+    # -Dunder Methods
+    def __getattr__(self, name: str) -> Any:
+        if name == '_tiles':
+            self._tiles = self._snapshot.read_tiles(self._index)
+            return self._tiles
+        raise AttributeError(name)
+
+    # -Properties
+    @property
+    def loaded(self) -> bool:
+        return '_tiles' in self.__dict__
+
+
+class Snapshot:
+    """
+    Memory-mapped floor snapshot
+        Fixed-width tile records per chunk with variable inventories/queues in a trailing pool
+        Also reads snapshots held in memory (bytes from pack_snapshot)
+        The map is closed once every chunk was decoded, or when the snapshot is collected
+    """
+
+    # -Constructor
+    def __init__(self, path: Path | bytes) -> None:
+        if isinstance(path, bytes):
+            self._map: mmap.mmap | bytes = path
+            path = "<bytes>"
+        else:
+            with open(path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            weakref.finalize(self, self._map.close)
+        magic, version, chunk_count, file_count, self.tiles_offset, self.pool_offset = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Snapshot '{path}' not valid")
+        # -Entity Files
+        offset = HEADER.size
+        self.entity_files: dict[int, str] = {}
+        for _ in range(file_count):
+            _id, length = FILE_ENTRY.unpack_from(self._map, offset)
+            offset += FILE_ENTRY.size
+            self.entity_files[_id] = self._map[offset:offset + length].decode()
+            offset += length
+        # -Chunks
+        self.chunks: list[tuple[int, int]] = [
+            CHUNK_ENTRY.unpack_from(self._map, offset + i * CHUNK_ENTRY.size)
+            for i in range(chunk_count)
+        ]
+        self._unread: set[int] = set(range(chunk_count))
+        if not self._unread:
+            self.close()
+
+    # -Instance Methods
+    def read_tiles(self, index: int) -> list[list[Entity | None]]:
+        '''Decodes the tiles of a single chunk'''
+        tiles: list[list[Entity | None]] = [[None] * Chunk.Size for _ in range(Chunk.Size)]
+        start = self.tiles_offset + index * CHUNK_BYTES
+        for position, record in enumerate(TILE.iter_unpack(self._map[start:start + CHUNK_BYTES])):
+            _id, flags, direction, kind, resource, value, pool_offset, pool_count = record
+            if not flags & OCCUPIED:
+                continue
+            entity = Entity(_id, direction)
+            entity.component = self._read_component(flags, kind, resource, value, pool_offset, pool_count)
+            x, y = divmod(position, Chunk.Size)
+            tiles[x][y] = entity
+        self._unread.discard(index)
+        if not self._unread:
+            self.close()
+        return tiles
+
+    def _read_component(
+        self, flags: int, kind: int, resource: int, value: float, pool_offset: int, pool_count: int
+    ) -> EntityComponent | None:
+        '''
+        '''
+        if kind == NO_COMPONENT:
+            return None
+        resource_id = None if flags & NO_RESOURCE else resource
+        value = value if flags & HAS_VALUE else None
+        if kind == PRODUCER:
+            return ProducerComponent(resource_id, value)
+        elif kind == TRANSPORTER:
+            return TransporterComponent(resource)
+        start = self.pool_offset + pool_offset * POOL_ENTRY.size
+        pool = list(POOL_ENTRY.iter_unpack(self._map[start:start + pool_count * POOL_ENTRY.size]))
+        if kind == QUEUE:
+            return QueueComponent(pool)
+        return CrafterComponent(resource_id, set(pool), value)
+
+    def close(self) -> None:
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+
+
+## Functions
+def save_snapshot(floor: Floor, path: Path) -> None:
+    """
+    Writes a floor as a compact binary snapshot
+    """
+    with open(path, 'wb') as f:
+        _write_snapshot(floor, f)
+
+
+def pack_snapshot(floor: Floor) -> bytes:
+    """
+    Gets a floor as compact binary snapshot bytes (picklable, e.g. to send between processes)
+    """
+    output = io.BytesIO()
+    _write_snapshot(floor, output)
+    return output.getvalue()
+
+
+def load_snapshot(path: Path | bytes) -> Floor:
+    """
+    Opens a binary snapshot (file or bytes) as a floor whose chunks are only decoded when touched
+    """
+    snapshot = Snapshot(path)
+    floor = Floor()
+    floor.entity_files.update(snapshot.entity_files)
+    with floor.untracked():
+        for index, (x, y) in enumerate(snapshot.chunks):
+            floor[x, y] = SnapshotChunk(x, y, snapshot, index)
+    return floor
+
+
+def _write_snapshot(floor: Floor, f: BinaryIO) -> None:
+    """
+    Writes the snapshot of a floor to a binary file
+    """
+    chunks = list(floor)
+    pool: list[tuple[int, int]] = []
+    tiles = bytearray(CHUNK_BYTES * len(chunks))
+    for index, chunk in enumerate(chunks):
+        start = index * CHUNK_BYTES
+        for (x, y), entity in chunk.tiles():
+            flags, kind, resource, value, pool_offset, pool_count = _pack_component(entity.component, pool)
+            TILE.pack_into(
+                tiles, start + (x * Chunk.Size + y) * TILE.size,
+                entity.id, flags | OCCUPIED, entity.direction,
+                kind, resource, value, pool_offset, pool_count,
+            )
+    files = b''.join(
+        FILE_ENTRY.pack(_id, len(name.encode())) + name.encode()
+        for _id, name in floor.entity_files.items()
+    )
+    tiles_offset = HEADER.size + len(files) + CHUNK_ENTRY.size * len(chunks)
+    f.write(HEADER.pack(MAGIC, VERSION, len(chunks), len(floor.entity_files), tiles_offset, tiles_offset + len(tiles)))
+    f.write(files)
+    for chunk in chunks:
+        f.write(CHUNK_ENTRY.pack(chunk.x, chunk.y))
+    f.write(tiles)
+    f.write(b''.join(POOL_ENTRY.pack(*entry) for entry in pool))
+
+
+def _pack_component(
+    component: EntityComponent | None, pool: list[tuple[int, int]]
+) -> tuple[int, int, int, float, int, int]:
+    """
+    Gets (flags, kind, resource, value, pool offset, pool count) of a component
+    """
+    if component is None:
+        return (0, NO_COMPONENT, 0, 0.0, 0, 0)
+    elif isinstance(component, TransporterComponent):
+        return (0, TRANSPORTER, component.id, 0.0, 0, 0)
+    elif isinstance(component, ProducerComponent):
+        kind, value, entries = (PRODUCER, component.timer, ())
+    elif isinstance(component, CrafterComponent):
+        kind, value, entries = (CRAFTER, component.energy, component.inventory)
+    elif isinstance(component, QueueComponent):
+        return (0, QUEUE, 0, 0.0, *_pack_pool(component.queue, pool))
+    else:
+        raise ValueError(f"Component '{type(component).__name__}' not valid")
+    flags = 0
+    resource = component.resource_id
+    if resource is None:
+        flags |= NO_RESOURCE
+        resource = 0
+    if value is not None:
+        flags |= HAS_VALUE
+    else:
+        value = math.nan
+    return (flags, kind, resource, value, *_pack_pool(entries, pool))
+
+
+def _pack_pool(entries: Any, pool: list[tuple[int, int]]) -> tuple[int, int]:
+    """
+    Appends entries to the pool and gets their (offset, count)
+    """
+    offset = len(pool)
+    pool.extend(entries)
+    return (offset, len(pool) - offset)
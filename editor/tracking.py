@@ -0,0 +1,140 @@
+#!/usr/bin/python
+##-------------------------------##
+## Assembly Line: Editor         ##
+## Written By: Ryan Smith        ##
+##-------------------------------##
+## Tracking                      ##
+##-------------------------------##
+
+## Imports
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Any
+from .chunk import Chunk
+from .entity import Entity
+from .floor import Floor
+from .simulator import compile_chunk, link_nodes
+
+
+## Classes
+class ChunkCache(ABC):
+    """
+    Per-chunk results of a floor that follow its edits
+        update() only recomputes the chunks affected since the last update (the written chunks
+        and, with neighbours, the chunks next to written edge tiles) and starts over when
+        the floor's journal no longer reaches back that far
+    """
+
+    # -Constructor
+    def __init__(self, floor: Floor, neighbours: bool = True) -> None:
+        self.floor: Floor = floor
+        self.neighbours: bool = neighbours
+        self.version: int = -1  # -Floor version the values are current for
+        self.values: dict[tuple[int, int], Any] = {}
+
+    # -Dunder Methods
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(version={self.version}, chunks={len(self.values)})"
+
+    # -Instance Methods
+    @abstractmethod
+    def compute(self, chunk: Chunk) -> Any:
+        '''Gets the value of one chunk'''
+
+    def update(self) -> set[tuple[int, int]]:
+        '''Brings the values up to the floor's version, gets the chunk positions that were recomputed'''
+        floor = self.floor
+        if self.version == floor.version:
+            return set()
+        changed = None
+        if self.version >= 0:
+            changed = floor.affected_chunks(self.version) if self.neighbours else floor.dirty_chunks(self.version)
+        if changed is None:
+            for position in list(self.values):
+                self._replace(position, None)
+            changed = {chunk.offset for chunk in floor}
+        for position in changed:
+            chunk = floor[position]
+            self._replace(position, self.compute(chunk) if chunk is not None else None)
+        self.version = floor.version
+        return changed
+
+    def _replace(self, position: tuple[int, int], value: Any) -> None:
+        '''
+        Swaps the value of a chunk (None: drops it)
+        '''
+        if value is None:
+            self.values.pop(position, None)
+        else:
+            self.values[position] = value
+
+
+class EntityCounts(ChunkCache):
+    """
+    Entity counts by type id of a floor, kept as per-chunk counts and a running total
+    """
+
+    # -Constructor
+    def __init__(self, floor: Floor) -> None:
+        super().__init__(floor, neighbours=False)
+        self.totals: Counter[int] = Counter()
+
+    # -Instance Methods
+    def compute(self, chunk: Chunk) -> Counter[int]:
+        '''
+        '''
+        return Counter(entity.id for entity in chunk)
+
+    def counts(self) -> dict[int, int]:
+        '''Gets the current type id -> entity count'''
+        self.update()
+        return {_id: count for _id, count in self.totals.items() if count}
+
+    def _replace(self, position: tuple[int, int], value: Counter[int] | None) -> None:
+        '''
+        '''
+        old = self.values.get(position)
+        if old is not None:
+            self.totals.subtract(old)
+        if value is not None:
+            self.totals.update(value)
+        super()._replace(position, value)
+
+
+class CompiledFloor(ChunkCache):
+    """
+    Incrementally compiled floor for flow analysis/simulation (see simulator.compile_floor)
+    """
+
+    # -Constructor
+    def __init__(self, floor: Floor) -> None:
+        super().__init__(floor, neighbours=False)
+
+    # -Instance Methods
+    def compute(self, chunk: Chunk) -> list[tuple[tuple[int, int], Entity, int, tuple[int, int]]]:
+        '''
+        '''
+        return compile_chunk(self.floor, chunk)
+
+    def compile(self) -> tuple[list[tuple[int, int]], list[Entity], list[int], list[int]]:
+        '''Gets the same (positions, entities, kinds, targets) as compile_floor, recompiling only changed chunks'''
+        self.update()
+        return link_nodes([node for nodes in self.values.values() for node in nodes])
+
+
+class ChunkDumps(ChunkCache):
+    """
+    Save file records of a floor per chunk, for manager.save_floor to skip unchanged chunks
+    """
+
+    # -Constructor
+    def __init__(self, floor: Floor) -> None:
+        super().__init__(floor, neighbours=False)
+
+    # -Instance Methods
+    def compute(self, chunk: Chunk) -> dict[str, list[dict[str, Any]]]:
+        '''
+        '''
+        from .manager import dump_chunk
+        return dump_chunk(self.floor, chunk)
@@ -7,48 +7,74 @@
 ##-------------------------------##
 
 ## Imports
+from __future__ import annotations
 from collections.abc import Iterable
+from .chunk import Chunk
+from .entity import Entity
 from .floor import Floor
 
 
 ## Classes
 class World:
     """
+    Assembly Line 2 World
+        Sparse floor index keyed by floor number, each floor a sparse chunk index
     """
 
     # -Constructor
     def __init__(self) -> None:
-        self._floors: list[Floor] = []
+        self._floors: dict[int, Floor] = {}
 
     # -Dunder Methods
     def __iter__(self) -> Iterable[Floor]:
-        for floor in self._floors:
-            yield flood
+        for index in sorted(self._floors):
+            yield self._floors[index]
 
     def __getitem__(self, index: int) -> Floor:
         return self._floors[index]
 
     def __setitem__(self, index: int, value: Floor) -> None:
-        this._floors[index] = value
+        self._floors[index] = value
+
+    def __contains__(self, index: int) -> bool:
+        return index in self._floors
 
     # -Instance Methods
-    def add_floor(self) -> None:
+    def add_floor(self, index: int | None = None) -> Floor:
         '''
+        Adds a floor with its first chunk enabled, after the highest floor by default
         '''
+        if index is None:
+            index = max(self._floors, default=-1) + 1
         floor = Floor()
         floor.enable_chunk(0, 0)
-        self._floors.append(floor)
+        self._floors[index] = floor
+        return floor
 
     def remove_floor(self, index: int) -> None:
         '''
         '''
-        pass
+        del self._floors[index]
 
-    # -Class Methods
+    def get_chunk_from_world_coordinates(self, index: int, x: int, y: int) -> Chunk | None:
+        '''
+        '''
+        floor = self._floors.get(index)
+        return floor.get_chunk_from_world_coordinates(x, y) if floor is not None else None
 
-    # -Static Methods
+    def entities_in_rect(
+        self, x: int, y: int, width: int, height: int
+    ) -> Iterable[tuple[int, tuple[int, int], Entity]]:
+        '''Iterates (floor, (world x, world y), entity) inside a rectangle across every floor'''
+        for index in sorted(self._floors):
+            for position, entity in self._floors[index].entities_in_rect(x, y, width, height):
+                yield (index, position, entity)
 
     # -Properties
+    @property
+    def floors(self) -> dict[int, Floor]:
+        return self._floors
+
     @property
     def floor_count(self) -> int:
-        return len(this._floors)
+        return len(self._floors)
@@ -0,0 +1,148 @@
+#!/usr/bin/python
+##-------------------------------##
+## Assembly Line                 ##
+## Written By: Ryan Smith        ##
+##-------------------------------##
+## Instrumentation               ##
+##-------------------------------##
+
+## Imports
+from __future__ import annotations
+import functools
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+
+## Classes
+class Stats:
+    """
+    Opt-in counters and timings
+        Everything is a no-op until enabled, hot paths only check `enabled` first
+    """
+
+    # -Constructor
+    def __init__(self) -> None:
+        self.enabled: bool = False
+        self.counters: dict[str, int] = {}
+        self.timings: dict[str, list[float]] = {}  # -Name -> [calls, total seconds, max seconds]
+
+    # -Dunder Methods
+    def __repr__(self) -> str:
+        return f"Stats(enabled={self.enabled}, counters={len(self.counters)}, timings={len(self.timings)})"
+
+    # -Instance Methods
+    def count(self, name: str, amount: int = 1) -> None:
+        '''Adds to a counter'''
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record(self, name: str, seconds: float) -> None:
+        '''Adds one timed call'''
+        if not self.enabled:
+            return
+        timing = self.timings.get(name)
+        if timing is None:
+            self.timings[name] = [1, seconds, seconds]
+            return
+        timing[0] += 1
+        timing[1] += seconds
+        if seconds > timing[2]:
+            timing[2] = seconds
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        '''Times a block'''
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def reset(self) -> None:
+        '''
+        '''
+        self.counters.clear()
+        self.timings.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        '''Gets a plain (json-able) copy of every counter and timing'''
+        return {
+            'counters': dict(self.counters),
+            'timings': {
+                name: {'calls': int(calls), 'total': total, 'mean': total / calls, 'max': peak}
+                for name, (calls, total, peak) in self.timings.items()
+            },
+        }
+
+
+## Globals
+STATS: Stats = Stats()
+
+
+## Functions
+def instrumented(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorates a function so its calls are timed under name while STATS is enabled"""
+    def _decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        '''
+        '''
+        @functools.wraps(func)
+        def _wrapper(*args: Any, **kwargs: Any) -> Any:
+            '''
+            '''
+            if not STATS.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                STATS.record(name, time.perf_counter() - start)
+        return _wrapper
+    return _decorator
+
+
+@contextmanager
+def capture(stats: bool = False, profile: Path | None = None, memory: bool = False) -> Iterator[dict[str, Any]]:
+    """
+    Turns on the requested instrumentation for a block
+        stats: enables STATS, profile: cProfile output file, memory: tracemalloc peak/top sites
+        The yielded dict is filled with the results once the block exits
+    """
+    import cProfile
+    import io
+    import pstats
+    import tracemalloc
+    results: dict[str, Any] = {}
+    profiler = cProfile.Profile() if profile is not None else None
+    if stats:
+        STATS.reset()
+        STATS.enabled = True
+    if memory:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield results
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile)
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(15)
+            results['profile'] = output.getvalue()
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results['memory'] = {
+                'peak_bytes': peak,
+                'top': [str(stat) for stat in snapshot.statistics('lineno')[:10]],
+            }
+        if stats:
+            STATS.enabled = False
+            results['stats'] = STATS.snapshot()
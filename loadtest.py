@@ -0,0 +1,126 @@
+#!/usr/bin/python
+##-------------------------------##
+## Assembly Line                 ##
+## Written By: Ryan Smith        ##
+##-------------------------------##
+## Service Load Test             ##
+##-------------------------------##
+
+## Imports
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+from service import PlanningService, serve
+
+## Constants
+ITEMS: tuple[str, ...] = ("robot", "circuit", "engine", "computer", "battery")
+RATES: tuple[float, ...] = (0.25, 0.5, 1.0, 1.5, 2.0)
+
+
+## Functions
+async def run_load(
+    host: str = '127.0.0.1', port: int = 0, unix: Path | None = None,
+    clients: int = 32, requests: int = 200, graphs: float = 0.05, seed: int = 0,
+) -> dict[str, Any]:
+    """
+    Drives an in-process planning service on localhost with concurrent keep-alive clients
+        clients: connections, requests: requests per client, graphs: fraction of /graph requests
+        Queries are drawn from a small item/rate pool so identical ones overlap and coalesce
+        Gets client side throughput/latency and the service's own /stats
+    """
+    service = PlanningService()
+    server = await serve(service, host, port, unix)
+    if unix is None:
+        host, port = server.sockets[0].getsockname()[:2]
+    latencies: list[float] = []
+    errors = 0
+    random.seed(seed)
+
+    async def _client() -> None:
+        '''
+        '''
+        nonlocal errors
+        if unix is not None:
+            reader, writer = await asyncio.open_unix_connection(str(unix))
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for _ in range(requests):
+                path = '/graph' if random.random() < graphs else '/plan'
+                query = f"item={random.choice(ITEMS)}&rate={random.choice(RATES)}"
+                start = time.perf_counter()
+                status, _ = await _request(reader, writer, f"GET {path}?{query}")
+                latencies.append(time.perf_counter() - start)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    async with server:
+        await asyncio.gather(*(_client() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+        reader, writer = await (
+            asyncio.open_unix_connection(str(unix)) if unix is not None
+            else asyncio.open_connection(host, port)
+        )
+        _, stats = await _request(reader, writer, "GET /stats", close=True)
+        writer.close()
+        await writer.wait_closed()
+    service.close()
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': elapsed,
+        'throughput': len(latencies) / elapsed,
+        'latency': {
+            name: latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+            for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99))
+        },
+        'service': json.loads(stats),
+    }
+
+
+async def _request(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, line: str, close: bool = False
+) -> tuple[int, bytes]:
+    """Sends one keep-alive (or closing) request, gets (status, body)"""
+    connection = 'close' if close else 'keep-alive'
+    writer.write(f"{line} HTTP/1.1\r\nHost: localhost\r\nConnection: {connection}\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (header := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = header.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return (status, await reader.readexactly(length))
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Runs a localhost load test and prints its results as json"""
+    parser = argparse.ArgumentParser(description="Assembly Line 2 planning service load test")
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=200, help="requests per client")
+    parser.add_argument('--graphs', type=float, default=0.05, help="fraction of graph exports")
+    parser.add_argument('--unix', type=Path, default=None, help="test over a unix socket instead")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    results = asyncio.run(run_load(
+        unix=args.unix, clients=args.clients, requests=args.requests,
+        graphs=args.graphs, seed=args.seed,
+    ))
+    print(json.dumps(results, indent=2))
+    return 1 if results['errors'] else 0
+
+
+## Body
+if __name__ == '__main__':
+    sys.exit(main())
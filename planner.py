@@ -0,0 +1,185 @@
+#!/usr/bin/python
+##-------------------------------##
+## Assembly Line                 ##
+## Written By: Ryan Smith        ##
+##-------------------------------##
+## Batch Planner                 ##
+##-------------------------------##
+
+## Imports
+from __future__ import annotations
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, TextIO
+
+import calculator
+
+## Constants
+CHUNK_SIZE: int = 256
+IN_FLIGHT: int = 4  # -Chunks queued per worker, bounds memory on unbounded input
+
+
+## Functions
+def solve_query(query: Any) -> dict[str, Any]:
+    """
+    Solves a single batch query
+        {"item": str, "rate": float} or {"targets": {item: rate, ...}}
+        optional "levels"/"speeds" (machine -> level/multiplier) run a calculator.what_if instead
+        Gets the calculator.plan plus its total starter count (the 'after' plan for what-ifs)
+    """
+    if not isinstance(query, dict):
+        raise ValueError(f"Query '{query}' not valid")
+    if 'targets' in query:
+        targets = query['targets']
+        if not isinstance(targets, dict) or not targets:
+            raise ValueError(f"Targets '{targets}' not valid")
+    elif 'item' in query:
+        targets = {query['item']: query.get('rate', 1.0)}
+    else:
+        raise ValueError(f"Query '{query}' not valid")
+    for target, rate in targets.items():
+        if not isinstance(rate, (int, float)) or isinstance(rate, bool) or not math.isfinite(rate):
+            raise ValueError(f"Rate '{rate}' for '{target}' not valid")
+    if 'levels' in query or 'speeds' in query:
+        comparison = calculator.what_if(targets, query.get('levels'), query.get('speeds'))
+        result = dict(comparison['after'], before=comparison['before'], change=comparison['machines'])
+    else:
+        result = calculator.plan(targets)
+    result['starter_count'] = sum(result['starters'].values())
+    return result
+
+
+def solve_lines(lines: Iterable[tuple[int, str]], brief: bool = False) -> list[str]:
+    """
+    Solves (line number, jsonl text) pairs into jsonl result lines
+        Every result carries its line (and the query's id when given); a query that fails
+        for any reason gets an error record instead of stopping the batch
+        brief: drops the per-item totals and breakdown
+    """
+    results: list[str] = []
+    for number, text in lines:
+        result: dict[str, Any] = {'line': number}
+        try:
+            query = json.loads(text)
+            if isinstance(query, dict) and 'id' in query:
+                result['id'] = query['id']
+            solved = solve_query(query)
+            if brief:
+                for key in ('items', 'breakdown', 'before'):
+                    solved.pop(key, None)
+            result.update(solved)
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+        results.append(json.dumps(result))
+    return results
+
+
+def iter_queries(file: TextIO) -> Iterator[tuple[int, str]]:
+    """Gets (line number, text) for every non-blank line of a jsonl stream"""
+    for number, line in enumerate(file, 1):
+        line = line.strip()
+        if line:
+            yield (number, line)
+
+
+def iter_chunks(queries: Iterable[tuple[int, str]], size: int = CHUNK_SIZE) -> Iterator[list[tuple[int, str]]]:
+    """Groups queries into lists of up to size"""
+    queries = iter(queries)
+    while chunk := list(itertools.islice(queries, size)):
+        yield chunk
+
+
+def run_batch(
+    queries: Iterable[tuple[int, str]], workers: int | None = None,
+    ordered: bool = True, brief: bool = False,
+    chunk_size: int = CHUNK_SIZE, recipes: Path | None = None,
+) -> Iterator[str]:
+    """
+    Solves a stream of queries across a process pool, yielding jsonl result lines
+        workers: process count (default: cpu count, 0 solves in this process)
+        ordered: results follow input order, else they stream out as chunks complete
+        recipes: recipe json to load in place of calculator.RECIPES_PATH
+    Input is read lazily and at most IN_FLIGHT chunks per worker are pending at once,
+    so memory stays bounded no matter how many queries are streamed through
+    """
+    chunks = iter_chunks(queries, chunk_size)
+    if workers == 0:
+        load_recipes(recipes)
+        for chunk in chunks:
+            yield from solve_lines(chunk, brief)
+        return
+    workers = workers or os.cpu_count() or 1
+    limit = workers * IN_FLIGHT
+    with ProcessPoolExecutor(workers, initializer=load_recipes, initargs=(recipes,)) as executor:
+        pending: deque[Future] | set[Future] = deque() if ordered else set()
+        for chunk in itertools.chain(chunks, (None,)):
+            if chunk is not None:
+                future = executor.submit(solve_lines, chunk, brief)
+                if ordered:
+                    pending.append(future)
+                else:
+                    pending.add(future)
+                if len(pending) < limit:
+                    continue
+            # -Full (or out of input): drain until there's room again
+            while pending and (chunk is None or len(pending) >= limit):
+                if ordered:
+                    yield from pending.popleft().result()
+                    continue
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+
+
+def load_recipes(recipes: Path | None = None) -> None:
+    """
+    Loads the recipe book (once per worker process) and warms the per-unit solve of every item
+    """
+    if recipes is not None:
+        calculator.RECIPES = calculator.RecipeBook(recipes)
+        calculator.SOLVE_CACHE = calculator.SolveCache()
+    for item in calculator.RECIPES:
+        calculator.SOLVE_CACHE.get(item)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Reads jsonl queries from a file (or stdin) and writes jsonl plans to a file (or stdout)"""
+    parser = argparse.ArgumentParser(description="Assembly Line 2 batch planner")
+    parser.add_argument('input', nargs='?', type=Path, default=None, help="jsonl queries (default: stdin)")
+    parser.add_argument('-o', '--output', type=Path, default=None, help="jsonl results (default: stdout)")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="processes (0: solve in-process)")
+    parser.add_argument('--unordered', action='store_true', help="write results as they complete")
+    parser.add_argument('--brief', action='store_true', help="leave out per-item totals and breakdowns")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--recipes', type=Path, default=None, help="recipe json (default: data/recipes.2.json)")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error(f"Chunk size '{args.chunk_size}' not valid")
+    source = sys.stdin if args.input is None else open(args.input, 'r')
+    target = sys.stdout if args.output is None else open(args.output, 'w')
+    try:
+        results = run_batch(
+            iter_queries(source), args.workers, not args.unordered,
+            args.brief, args.chunk_size, args.recipes,
+        )
+        for line in results:
+            target.write(line + '\n')
+    finally:
+        if args.input is not None:
+            source.close()
+        if args.output is not None:
+            target.close()
+    return 0
+
+
+## Body
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,307 @@
+#!/usr/bin/python
+##-------------------------------##
+## Assembly Line                 ##
+## Written By: Ryan Smith        ##
+##-------------------------------##
+## Planning Service              ##
+##-------------------------------##
+
+## Imports
+from __future__ import annotations
+import argparse
+import asyncio
+import io
+import json
+import math
+import multiprocessing
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qsl, urlsplit
+
+import calculator
+from instrumentation import Stats
+from planner import load_recipes, solve_query
+
+## Constants
+MAX_BODY: int = 1 << 20
+LATENCY_WINDOW: int = 4096  # -Recent request latencies kept for percentiles
+REASONS: dict[int, str] = {
+    200: "OK", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 500: "Internal Server Error",
+}
+
+
+## Classes
+class PlanningService:
+    """
+    Local planning service over HTTP/1.1 (tcp or unix socket)
+        GET/POST /plan: planner.solve_query queries (item/rate/targets/levels/speeds)
+        GET/POST /graph: graphviz dot source of get_machine_count(item, rate)
+        GET /stats: request/solve counters, throughput and latency percentiles
+    Identical in-flight queries share one solve and every query that arrives within an
+    event loop tick is solved in one batch on the loop thread. Graph exports run in the default
+    executor and what-ifs (which change the machine speeds while they solve) in a separate
+    worker process, so neither blocks the loop nor sees the other's machine speeds
+    """
+
+    # -Constructor
+    def __init__(self) -> None:
+        self.stats: Stats = Stats()
+        self.stats.enabled = True
+        self.started: float = time.perf_counter()
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._queue: list[tuple[str, dict[str, Any]]] = []
+        self._scheduled: bool = False
+        self._what_ifs: ProcessPoolExecutor | None = None
+
+    # -Dunder Methods
+    def __repr__(self) -> str:
+        return f"PlanningService(inflight={len(self._inflight)}, requests={self.stats.counters.get('requests', 0)})"
+
+    # -Instance Methods
+    async def plan(self, query: dict[str, Any]) -> dict[str, Any]:
+        '''
+        Solves a query, sharing the solve with an identical query already in flight
+        '''
+        key = json.dumps({name: value for name, value in query.items() if name != 'id'}, sort_keys=True)
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats.count('coalesced')
+            return await asyncio.shield(future)
+        loop = asyncio.get_running_loop()
+        if 'levels' in query or 'speeds' in query:
+            self.stats.count('what_ifs')
+            if self._what_ifs is None:
+                # -Spawned: forking next to the export threads could copy a held lock
+                context = multiprocessing.get_context('spawn')
+                self._what_ifs = ProcessPoolExecutor(1, context, initializer=load_recipes)
+            future = self._inflight[key] = loop.run_in_executor(self._what_ifs, solve_query, query)
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+            return await asyncio.shield(future)
+        future = self._inflight[key] = loop.create_future()
+        self._queue.append((key, query))
+        if not self._scheduled:
+            self._scheduled = True
+            loop.call_soon(self._flush)
+        return await asyncio.shield(future)
+
+    async def graph(self, item: str, rate: float, merged: bool = True) -> str:
+        '''
+        Gets the graphviz dot source of a machine tree, built off the event loop
+        '''
+        if not math.isfinite(rate) or rate < 0:
+            raise ValueError(f"Rate '{rate}' for '{item}' not valid")
+        data = calculator.get_machine_count(item, rate)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._export, data, merged)
+
+    def close(self) -> None:
+        '''Stops the what-if worker process'''
+        if self._what_ifs is not None:
+            self._what_ifs.shutdown(cancel_futures=True)
+            self._what_ifs = None
+
+    def snapshot(self) -> dict[str, Any]:
+        '''Gets the service counters, throughput and latency percentiles'''
+        snapshot = self.stats.snapshot()
+        uptime = time.perf_counter() - self.started
+        latencies = sorted(self.latencies)
+        snapshot['uptime'] = uptime
+        snapshot['throughput'] = snapshot['counters'].get('requests', 0) / uptime if uptime else 0.0
+        snapshot['latency'] = {
+            name: latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+            for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99))
+        } if latencies else {}
+        return snapshot
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        '''
+        Serves keep-alive HTTP/1.1 requests on one connection
+        '''
+        self.stats.count('connections')
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                start = time.perf_counter()
+                method, target, headers, body = request
+                status, payload, content_type = await self._route(method, target, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(_format_response(status, payload, content_type, keep_alive))
+                await writer.drain()
+                elapsed = time.perf_counter() - start
+                self.latencies.append(elapsed)
+                self.stats.count('requests')
+                self.stats.record(f"{method} {urlsplit(target).path}", elapsed)
+                if status >= 400:
+                    self.stats.count(f"status.{status}")
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as e:
+            self.stats.count('status.400')
+            writer.write(_format_response(400, _error(e), 'application/json', False))
+        finally:
+            writer.close()
+
+    def _export(self, machine_data: Any, merged: bool) -> str:
+        '''
+        Gets the dot source of a machine tree (runs in an executor thread)
+        '''
+        with self.stats.timer('export'):
+            output = io.StringIO()
+            calculator.write_machine_dot(machine_data, output, merged)
+            return output.getvalue()
+
+    def _flush(self) -> None:
+        '''
+        Solves every query queued during this loop tick as one batch
+            Every queued future is resolved or failed, whatever a solve raises
+        '''
+        queue, self._queue = (self._queue, [])
+        self._scheduled = False
+        self.stats.count('batches')
+        with self.stats.timer('batch'):
+            try:
+                for key, query in queue:
+                    future = self._inflight.pop(key)
+                    self.stats.count('solves')
+                    try:
+                        result = solve_query(query)
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+                        continue
+                    if not future.done():
+                        future.set_result(result)
+            finally:
+                for key, _ in queue:
+                    future = self._inflight.pop(key, None)
+                    if future is not None and not future.done():
+                        future.set_exception(RuntimeError("Batch aborted"))
+
+    async def _route(self, method: str, target: str, body: bytes) -> tuple[int, bytes, str]:
+        '''
+        Dispatches one request, gets (status, payload, content type)
+        '''
+        url = urlsplit(target)
+        if url.path not in ('/plan', '/graph', '/stats'):
+            return (404, _error(f"Path '{url.path}' not valid"), 'application/json')
+        if method not in ('GET', 'POST') or (url.path == '/stats' and method != 'GET'):
+            return (405, _error(f"Method '{method}' not valid"), 'application/json')
+        if url.path == '/stats':
+            return (200, json.dumps(self.snapshot()).encode(), 'application/json')
+        try:
+            if method == 'POST':
+                query = json.loads(body or b'{}')
+            else:
+                query = dict(parse_qsl(url.query))
+                if 'rate' in query:
+                    query['rate'] = float(query['rate'])
+            if not isinstance(query, dict):
+                raise ValueError(f"Query '{query}' not valid")
+            if url.path == '/graph':
+                merged = str(query.get('merged', '1')).lower() not in ('0', 'false')
+                dot = await self.graph(query.get('item', ''), float(query.get('rate', 1.0)), merged)
+                return (200, dot.encode(), 'text/vnd.graphviz')
+            return (200, json.dumps(await self.plan(query)).encode(), 'application/json')
+        except (KeyError, ValueError, TypeError) as e:
+            return (400, _error(e), 'application/json')
+        except Exception as e:
+            return (500, _error(e), 'application/json')
+
+
+## Functions
+async def serve(
+    service: PlanningService | None = None, host: str = '127.0.0.1', port: int = 8080,
+    unix: Path | None = None,
+) -> asyncio.AbstractServer:
+    """
+    Starts a planning service on host:port (or a unix socket), warming the recipe book first
+    """
+    service = service or PlanningService()
+    load_recipes()
+    if unix is not None:
+        return await asyncio.start_unix_server(service.handle, path=str(unix))
+    return await asyncio.start_server(service.handle, host, port)
+
+
+async def _read_request(reader: asyncio.StreamReader) -> tuple[str, str, dict[str, str], bytes] | None:
+    """
+    Reads one HTTP/1.1 request, gets (method, target, headers, body) or None once the client closed
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    parts = line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise ValueError(f"Request line '{line!r}' not valid")
+    method, target, _ = parts
+    headers: dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if not 0 <= length <= MAX_BODY:
+        raise ValueError(f"Content length '{length}' not valid")
+    body = await reader.readexactly(length) if length else b''
+    return (method, target, headers, body)
+
+
+def _format_response(status: int, payload: bytes, content_type: str, keep_alive: bool) -> bytes:
+    """Gets the bytes of an HTTP/1.1 response"""
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode('latin-1') + payload
+
+
+def _error(error: Exception | str) -> bytes:
+    """Gets a json error payload"""
+    if isinstance(error, Exception):
+        error = f"{type(error).__name__}: {error}"
+    return json.dumps({'error': error}).encode()
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Runs the planning service until interrupted"""
+    parser = argparse.ArgumentParser(description="Assembly Line 2 planning service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--unix', type=Path, default=None, help="listen on a unix socket instead")
+    args = parser.parse_args(argv)
+
+    async def _run() -> None:
+        '''
+        '''
+        service = PlanningService()
+        server = await serve(service, args.host, args.port, args.unix)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            service.close()
+
+    try:
+        asyncio.run(_run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+## Body
+if __name__ == '__main__':
+    sys.exit(main())
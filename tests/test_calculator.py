@@ -0,0 +1,160 @@
+#!/usr/bin/python
+##-------------------------------##
+## Assembly Line: Tests          ##
+## Written By: Ryan Smith        ##
+##-------------------------------##
+## Calculator                    ##
+##-------------------------------##
+
+## Imports
+from __future__ import annotations
+import math
+from typing import Any
+import numpy
+import pytest
+
+import calculator
+
+
+## Functions
+@pytest.fixture(autouse=True)
+def recipes(monkeypatch: pytest.MonkeyPatch) -> calculator.RecipeBook:
+    """Swaps in a fresh recipe book (and solve cache) for every test"""
+    book = calculator.RecipeBook(calculator.RECIPES_PATH, cache_path=None)
+    monkeypatch.setattr(calculator, 'RECIPES', book)
+    monkeypatch.setattr(calculator, 'SOLVE_CACHE', calculator.SolveCache())
+    return book
+
+
+def _assert_ranks(book: calculator.RecipeBook) -> None:
+    """Checks every rank is 1 + the highest rank of the recipe's inputs"""
+    for output, recipe in book.items():
+        inputs = recipe.get('inputs', {})
+        expected = 1 + max(book.ranks[item] for item in inputs) if inputs else 0
+        assert book.ranks[output] == expected, output
+
+
+def test_redefine_with_later_input(recipes: calculator.RecipeBook) -> None:
+    calculator.add_recipe('battery', 'crafter1', trigger=1)
+    assert recipes['battery']['inputs'] == {'trigger': 1}
+    _assert_ranks(recipes)
+    assert 'battery' in recipes.consumers('trigger')
+    incremental = dict(recipes.requirements('laser'))
+    recipes._build_indexes()
+    assert incremental == pytest.approx(recipes.requirements('laser'))
+
+
+def test_redefine_with_new_input(recipes: calculator.RecipeBook) -> None:
+    calculator.add_recipes({
+        'battery': {'machine': 'crafter1', 'inputs': {'copper': 1, 'spark': 2}},
+        'spark': {'machine': 'cutter', 'inputs': {'gold': 1}},
+    })
+    _assert_ranks(recipes)
+    assert recipes.ranks['spark'] < recipes.ranks['battery'] < recipes.ranks['laser']
+    assert 'spark' in recipes.requirements('laser')
+
+
+def test_redefine_cycle_leaves_book_unchanged(recipes: calculator.RecipeBook) -> None:
+    before = dict(recipes['battery'])
+    version = recipes.version
+    with pytest.raises(ValueError):
+        calculator.add_recipe('battery', 'crafter1', laser=1)
+    assert recipes['battery'] == before
+    assert recipes.version == version
+    _assert_ranks(recipes)
+
+
+@pytest.mark.parametrize('rate', [-1.0, math.inf, math.nan])
+def test_plan_rejects_invalid_rates(rate: float) -> None:
+    with pytest.raises(ValueError):
+        calculator.plan({'robot': rate})
+
+
+@pytest.mark.parametrize('solve', [
+    calculator.get_machine_totals, calculator.get_machine_plan,
+    lambda item: calculator.get_max_rate(item, {'starter1': 4}),
+])
+def test_unknown_item_not_solved(solve: Any) -> None:
+    with pytest.raises(KeyError, match="robto"):
+        solve('robto')
+    assert len(calculator.SOLVE_CACHE) == 0
+
+
+def test_simplex_known_optimum() -> None:
+    # -max 3x + 5y: x <= 4, 2y <= 12, 3x + 2y <= 18 -> (2, 6) = 36, duals (0, 1.5, 1)
+    A = numpy.array([[1.0, 0.0], [0.0, 2.0], [3.0, 2.0]])
+    x, duals = calculator._simplex(numpy.array([3.0, 5.0]), A, numpy.array([4.0, 12.0, 18.0]))
+    assert x == pytest.approx([2.0, 6.0])
+    assert duals == pytest.approx([0.0, 1.5, 1.0])
+
+
+def test_simplex_degenerate_does_not_cycle() -> None:
+    # -Beale's example: cycles under the largest coefficient rule, Bland's rule must finish
+    c = numpy.array([0.75, -20.0, 0.5, -6.0])
+    A = numpy.array([[0.25, -8.0, -1.0, 9.0], [0.5, -12.0, -0.5, 3.0], [0.0, 0.0, 1.0, 0.0]])
+    x, _ = calculator._simplex(c, A, numpy.array([0.0, 0.0, 1.0]))
+    assert c @ x == pytest.approx(1.25)
+    assert (A @ x <= [1e-9, 1e-9, 1.0 + 1e-9]).all()
+
+
+def test_simplex_degenerate_tie() -> None:
+    # -(1, 1) is on all three constraints, two of them tie on the ratio test
+    A = numpy.array([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]])
+    x, _ = calculator._simplex(numpy.array([1.0, 1.0]), A, numpy.array([1.0, 1.0, 2.0]))
+    assert x == pytest.approx([1.0, 1.0])
+
+
+def test_simplex_errors() -> None:
+    with pytest.raises(ValueError, match="unbounded"):
+        calculator._simplex(numpy.array([1.0, 1.0]), numpy.array([[1.0, -1.0]]), numpy.array([1.0]))
+    with pytest.raises(ValueError, match="negative"):
+        calculator._simplex(numpy.array([1.0]), numpy.array([[1.0]]), numpy.array([-1.0]))
+
+
+@pytest.mark.parametrize(('wires', 'rate', 'binding'), [
+    (10, 4.0, 'starter:copper'),
+    (2, 2.0, 'machine:wire'),
+])
+def test_optimize_binding_constraint(wires: int, rate: float, binding: str) -> None:
+    result = calculator.optimize({'copper': 1}, {'wire': wires}, {'copper_wire': 1.0})
+    assert result['rates'] == pytest.approx({'copper_wire': rate})
+    assert result['binding'] == [binding]
+    constraints = result['constraints']
+    slack = next(name for name in constraints if name != binding)
+    assert constraints[slack]['slack'] > 0
+    assert constraints[slack]['shadow_price'] == pytest.approx(0.0)
+    # -Shadow price: value per extra unit of the binding limit
+    assert constraints[binding]['shadow_price'] == pytest.approx(rate / constraints[binding]['limit'])
+    assert result['plan']['items']['copper_wire']['rate'] == pytest.approx(rate)
+
+
+def test_optimize_errors() -> None:
+    with pytest.raises(ValueError, match="negative"):
+        calculator.optimize({'copper': -1}, values={'copper_wire': 1.0})
+    with pytest.raises(ValueError, match="do not bound"):
+        calculator.optimize({'gold': 1}, values={'copper_wire': 1.0})
+    with pytest.raises(ValueError):
+        calculator.optimize(values={'copper_wire': 1.0})
+    with pytest.raises(KeyError):
+        calculator.optimize({'copper_wire': 1})
+
+
+def test_set_machine_speed_refreshes_solves(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(calculator, 'MACHINE_SPEEDS', {})
+    before = calculator.get_machine_totals('copper_wire')['copper_wire']['count']
+    calculator.set_machine_speed('wire', 2.0)
+    assert calculator.get_machine_totals('copper_wire')['copper_wire']['count'] == pytest.approx(before / 2)
+    calculator.set_machine_speed('wire', None)
+    assert calculator.get_machine_totals('copper_wire')['copper_wire']['count'] == pytest.approx(before)
+
+
+@pytest.mark.parametrize(('machine', 'speed', 'error'), [
+    ('wires', 2.0, KeyError), ('wire', 0.0, ValueError), ('wire', math.inf, ValueError), ('wire', math.nan, ValueError),
+])
+def test_set_machine_speed_rejects(monkeypatch: pytest.MonkeyPatch, machine: str, speed: float, error: type) -> None:
+    monkeypatch.setattr(calculator, 'MACHINE_SPEEDS', {})
+    with pytest.raises(error):
+        calculator.set_machine_speed(machine, speed)
+    with pytest.raises(error):
+        calculator.what_if({'copper_wire': 1.0}, speeds={machine: speed})
+    assert calculator.MACHINE_SPEEDS == {}
@@ -0,0 +1,55 @@
+#!/usr/bin/python
+##-------------------------------##
+## Assembly Line: Tests          ##
+## Written By: Ryan Smith        ##
+##-------------------------------##
+## Floor                         ##
+##-------------------------------##
+
+## Imports
+from __future__ import annotations
+
+import pytest
+
+from editor.chunk import ArrayChunk, Chunk
+from editor.entity import Entity, ProducerComponent
+from editor.floor import Floor
+
+
+## Functions
+@pytest.fixture(params=[Chunk, ArrayChunk])
+def floor(request: pytest.FixtureRequest) -> Floor:
+    """Gets a 2x1 chunk floor of each chunk backend"""
+    floor = Floor(request.param)
+    floor.enable_chunk(0, 0)
+    floor.enable_chunk(1, 0)
+    return floor
+
+
+def _get_producer(resource_id: int) -> Entity:
+    """Gets a starter entity producing a resource"""
+    entity = Entity(0, 0)
+    entity.component = ProducerComponent(resource_id, None)
+    return entity
+
+
+def test_replace_while_iterating_index(floor: Floor) -> None:
+    for x in range(12):
+        floor.set_entity(x, 0, _get_producer(1))
+    for (x, y), _ in floor.entities_of_resource(1):
+        floor.set_entity(x, y, _get_producer(2))
+    for (x, y), _ in floor.entities_of_type(0):
+        floor.set_entity(x, y + 1, Entity(0, 0))
+    assert floor.positions_of_resource(1) == frozenset()
+    assert len(floor.positions_of_resource(2)) == 12
+    assert len(floor.positions_of_type(0)) == 24
+
+
+def test_index_copies_are_detached(floor: Floor) -> None:
+    floor.set_entity(3, 3, Entity(2, 0))
+    positions = floor.positions_of_type(2)
+    with pytest.raises(AttributeError):
+        positions.add((4, 4))
+    floor.set_entity(4, 4, Entity(2, 0))
+    assert positions == {(3, 3)}
+    assert floor.positions_of_type(2) == {(3, 3), (4, 4)}
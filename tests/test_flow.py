@@ -0,0 +1,66 @@
+#!/usr/bin/python
+##-------------------------------##
+## Assembly Line: Tests          ##
+## Written By: Ryan Smith        ##
+##-------------------------------##
+## Flow                          ##
+##-------------------------------##
+
+## Imports
+from __future__ import annotations
+
+import pytest
+
+import calculator
+from editor.entity import CrafterComponent, Entity, ProducerComponent, QueueComponent
+from editor.floor import Floor
+from editor.flow import analyze_floor, get_queued_resources, join_machine_totals
+
+
+## Functions
+def _get_floor() -> Floor:
+    """Gets a single chunk floor"""
+    floor = Floor()
+    floor.enable_chunk(0, 0)
+    return floor
+
+
+def test_resource_table_rejects_non_int_ids() -> None:
+    for _id in (None, 'copper', -1, 1.0, True):
+        assert calculator.RESOURCES.get(_id) is None
+
+
+def test_crafter_without_resource() -> None:
+    floor = _get_floor()
+    crafter = Entity(5)
+    crafter.component = CrafterComponent(None, set())
+    floor.set_entity(1, 1, crafter)
+    assert analyze_floor(floor)['nodes'][1, 1]['recipe'] is None
+
+
+def test_queued_resources_count_items() -> None:
+    floor = _get_floor()
+    copper = calculator.RESOURCES.id_of('copper')
+    transformer = Entity(7)
+    transformer.component = QueueComponent([(copper, 3), (copper + 1, 1), (copper, 2)])
+    floor.set_entity(3, 3, transformer)
+    queued = get_queued_resources(floor)
+    assert queued['copper'] == 5
+    assert queued[calculator.RESOURCES[copper + 1]] == 1
+
+
+@pytest.mark.parametrize('_id', [None, 'copper', -1, 1.0, True, 1 << 20])
+def test_resource_table_machine_of_rejects_invalid_ids(_id: object) -> None:
+    with pytest.raises(KeyError):
+        calculator.RESOURCES.machine_of(_id)
+
+
+def test_join_machine_totals_copies_positions() -> None:
+    floor = _get_floor()
+    copper = calculator.RESOURCES.id_of('copper')
+    starter = Entity(0)
+    starter.component = ProducerComponent(copper, None)
+    floor.set_entity(0, 0, starter)
+    joined = join_machine_totals(floor, 'copper', 1.0)
+    joined['copper']['positions'].clear()
+    assert floor.positions_of_resource(copper) == {(0, 0)}
@@ -0,0 +1,70 @@
+#!/usr/bin/python
+##-------------------------------##
+## Assembly Line: Tests          ##
+## Written By: Ryan Smith        ##
+##-------------------------------##
+## Manager                       ##
+##-------------------------------##
+
+## Imports
+from __future__ import annotations
+import json
+from pathlib import Path
+
+import pytest
+
+from editor.entity import Entity, ProducerComponent
+from editor.floor import Floor
+from editor.manager import _iter_json_array, load_floor, save_floor
+
+## Constants
+ELEMENTS: list = [
+    {'Type': 1, 'Position': [1.0, 2.0], 'Name': "a, ]b"},
+    [], {}, 12.5, -3e-05, 1234567, "x", None, True, [1, [2, {'c': [3]}]],
+]
+
+
+## Functions
+def _write(path: Path, text: str) -> Path:
+    """Writes a text file, gets its path"""
+    path.write_text(text)
+    return path
+
+
+@pytest.mark.parametrize('read_size', [1, 3, 7, 1 << 16])
+@pytest.mark.parametrize('text', [json.dumps(ELEMENTS), json.dumps(ELEMENTS, indent=4)])
+def test_iter_json_array_streams(tmp_path: Path, read_size: int, text: str) -> None:
+    file = _write(tmp_path / "data.json", text)
+    assert list(_iter_json_array(file, read_size, stream_size=0)) == ELEMENTS
+
+
+@pytest.mark.parametrize('stream_size', [0, 1 << 20])
+@pytest.mark.parametrize('text', ["[]", " [ ] \n", "[\n\n]"])
+def test_iter_json_array_empty(tmp_path: Path, stream_size: int, text: str) -> None:
+    file = _write(tmp_path / "data.json", text)
+    assert list(_iter_json_array(file, 1, stream_size)) == []
+
+
+@pytest.mark.parametrize('stream_size', [0, 1 << 20])
+@pytest.mark.parametrize('text', ["", "[", "[1, 2", "[1, 2,", '[{"a": 1', "[1 2]", "[1] 2", "{}"])
+def test_iter_json_array_invalid(tmp_path: Path, stream_size: int, text: str) -> None:
+    file = _write(tmp_path / "data.json", text)
+    with pytest.raises(ValueError):
+        list(_iter_json_array(file, 2, stream_size))
+
+
+def test_load_floor_fails_fast(tmp_path: Path) -> None:
+    floor = Floor()
+    floor.enable_chunk(0, 0)
+    floor.entity_files[2] = "rollers.json"
+    entity = Entity(0, 0)
+    entity.component = ProducerComponent(1)
+    floor.set_entity(1, 1, entity)
+    floor.set_entity(2, 2, Entity(2, 0))
+    save_floor(floor, tmp_path)
+    report: dict = {}
+    assert load_floor(tmp_path, report=report).get_entity(1, 1).component.resource_id == 1
+    assert report["starters.json"]['entities'] == report["rollers.json"]['entities'] == 1
+    _write(tmp_path / "starters.json", '[{"Type": 0, "Direction": 0, "Position": [1.0, 1.0]')
+    with pytest.raises(ValueError, match="starters.json"):
+        load_floor(tmp_path)
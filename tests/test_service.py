@@ -0,0 +1,24 @@
+#!/usr/bin/python
+##-------------------------------##
+## Assembly Line: Tests          ##
+## Written By: Ryan Smith        ##
+##-------------------------------##
+## Planning Service              ##
+##-------------------------------##
+
+## Imports
+from __future__ import annotations
+import asyncio
+
+import pytest
+
+from service import PlanningService
+
+
+## Functions
+@pytest.mark.parametrize(('query', 'status'), [
+    ("rate=nan", 400), ("rate=inf", 400), ("rate=-1", 400), ("rate=x", 400), ("rate=2", 200),
+])
+def test_graph_rate(query: str, status: int) -> None:
+    response = asyncio.run(PlanningService()._route('GET', f"/graph?item=robot&{query}", b''))
+    assert response[0] == status
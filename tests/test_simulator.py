@@ -0,0 +1,100 @@
+#!/usr/bin/python
+##-------------------------------##
+## Assembly Line: Tests          ##
+## Written By: Ryan Smith        ##
+##-------------------------------##
+## Simulator                     ##
+##-------------------------------##
+
+## Imports
+from __future__ import annotations
+
+import pytest
+
+import calculator
+from editor.entity import CrafterComponent, Entity, ProducerComponent, QueueComponent
+from editor.floor import Floor
+from editor.flow import analyze_floor
+from editor.simulator import FloorSimulation, compare_with_calculator
+
+
+## Functions
+def _get_empty_floor() -> Floor:
+    """Gets a single chunk floor with starters (0), rollers (2), sellers (3), transformers (7) and crafters (9)"""
+    floor = Floor()
+    floor.enable_chunk(0, 0)
+    floor.entity_files.update({
+        0: 'starters.json', 2: 'rollers.json', 3: 'sellers.json',
+        7: 'transformers.json', 9: 'crafters.json',
+    })
+    return floor
+
+
+def _get_starter(resource: str, direction: int) -> Entity:
+    """Gets an untimed starter of a resource"""
+    entity = Entity(0, direction)
+    entity.component = ProducerComponent(calculator.RESOURCES.id_of(resource), None)
+    return entity
+
+
+def _get_floor(timer: float | None) -> Floor:
+    """Gets a floor of one copper starter feeding a seller through a roller"""
+    floor = _get_empty_floor()
+    chunk = floor[0, 0]
+    chunk[0, 0] = Entity(0, 0)
+    chunk[0, 0].component = ProducerComponent(calculator.RESOURCES.id_of('copper'), timer)
+    chunk[0, 1] = Entity(2, 0)
+    chunk[0, 2] = Entity(3, 0)
+    return floor
+
+
+@pytest.mark.parametrize('timer', [None, 0.5])
+def test_producer_matches_flow(timer: float | None) -> None:
+    floor = _get_floor(timer)
+    resources = FloorSimulation(floor, tick=0.05).run(2000)['resources']
+    sold = analyze_floor(floor)['sold']
+    assert resources[calculator.RESOURCES.id_of('copper')] == pytest.approx(sold['copper'], rel=0.01)
+
+
+def test_crafter_matches_calculator() -> None:
+    floor = _get_empty_floor()
+    chunk = floor[0, 0]
+    rack = calculator.RESOURCES.id_of('server_rack')
+    chunk[0, 0] = _get_starter('aluminium', 0)
+    chunk[0, 1] = Entity(2, 1)
+    chunk[2, 1] = _get_starter('iron', 3)
+    chunk[1, 1] = Entity(9, 0)
+    chunk[1, 1].component = CrafterComponent(rack, set())
+    chunk[1, 2] = Entity(3, 0)
+    results = FloorSimulation(floor, tick=0.05).run(4000)
+    assert results['resources'][rack] == pytest.approx(analyze_floor(floor)['sold']['server_rack'], rel=0.01)
+    comparison = compare_with_calculator(results, None, rack)
+    assert set(comparison) == {'server_rack', 'aluminium', 'iron'}
+    assert all(entry['built'] == 1 and entry['shortfall'] == 0 for entry in comparison.values())
+
+
+def test_transformer_converts_with_machine() -> None:
+    floor = _get_empty_floor()
+    chunk = floor[0, 0]
+    chunk[0, 0] = _get_starter('copper', 0)
+    chunk[0, 1] = Entity(7, 0)
+    chunk[0, 1].component = QueueComponent([])
+    chunk[0, 2] = Entity(3, 0)
+    resources = FloorSimulation(floor, machines={7: 'wire'}).run(200)['resources']
+    assert set(resources) == {calculator.RESOURCES.id_of('copper_wire')}
+
+
+@pytest.mark.parametrize('rollers', [
+    {(1, 1): 0, (1, 2): 1, (2, 2): 2, (2, 1): 3},
+    {(1, 1): 0, (1, 2): 2},
+])
+def test_full_roller_loop_blocks(rollers: dict[tuple[int, int], int]) -> None:
+    floor = _get_empty_floor()
+    chunk = floor[0, 0]
+    chunk[0, 1] = _get_starter('copper', 1)
+    for (x, y), direction in rollers.items():
+        chunk[x, y] = Entity(2, direction)
+    simulation = FloorSimulation(floor)
+    machine = simulation.run(100)['machines'][0, 1]
+    assert machine['blocked'] > 0.5
+    assert simulation.slot[:simulation.size].tolist().count(-1) == 0
@@ -0,0 +1,111 @@
+#!/usr/bin/python
+##-------------------------------##
+## Assembly Line: Tests          ##
+## Written By: Ryan Smith        ##
+##-------------------------------##
+## Snapshot                      ##
+##-------------------------------##
+
+## Imports
+from __future__ import annotations
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from editor.chunk import ArrayChunk, Chunk
+from editor.entity import (
+    CrafterComponent, Entity, EntityComponent, ProducerComponent, QueueComponent, TransporterComponent,
+)
+from editor.floor import Floor
+from editor.manager import load_floor, save_floor
+from editor.snapshot import HEADER, MAGIC, VERSION, Snapshot, load_snapshot, pack_snapshot, save_snapshot
+
+## Constants
+# -Type id, save file, component of every component kind (and its optional fields)
+ENTITIES: tuple[tuple[int, str, EntityComponent | None], ...] = (
+    (0, "starters.json", ProducerComponent(4)),
+    (1, "importers.json", ProducerComponent(5, 2.5)),
+    (2, "rollers.json", None),
+    (3, "sellers.json", None),
+    (4, "transporter_inputs.json", TransporterComponent(7)),
+    (5, "transformers.json", QueueComponent([(4, 2), (5, 1), (4, 3)])),
+    (6, "crafters.json", CrafterComponent(9, {(4, 2), (5, 1)})),
+    (7, "crafters.json", CrafterComponent(None, set())),
+    (8, "radioactive_crafters.json", CrafterComponent(9, {(6, 3)}, 0.75)),
+)
+
+
+## Functions
+def _get_floor(chunk_type: type[Chunk]) -> Floor:
+    """Gets a floor with one entity of every component kind spread over two chunks"""
+    floor = Floor(chunk_type)
+    floor.enable_chunk(0, 0)
+    floor.enable_chunk(1, 2)
+    for i, (_id, file, component) in enumerate(ENTITIES):
+        entity = Entity(_id, i % 4)
+        entity.component = component
+        floor.set_entity(i * 2, 3 if i < 5 else 25, entity)
+        floor.entity_files[_id] = file
+    return floor
+
+
+def _dump(floor: Floor) -> list[tuple[Any, ...]]:
+    """Gets every entity of a floor as comparable plain data"""
+    entities = []
+    for chunk in floor:
+        for (x, y), entity in chunk.tiles():
+            component = entity.component
+            fields = None
+            if component is not None:
+                fields = (type(component).__name__, *(
+                    sorted(value) if isinstance(value, set) else value
+                    for value in (getattr(component, name) for name in component.__slots__)
+                ))
+            entities.append((chunk.x_offset + x, chunk.y_offset + y, entity.id, entity.direction, fields))
+    return sorted(entities, key=lambda entity: entity[:2])
+
+
+@pytest.mark.parametrize('chunk_type', [Chunk, ArrayChunk])
+def test_save_floor_round_trip(tmp_path: Path, chunk_type: type[Chunk]) -> None:
+    floor = _get_floor(chunk_type)
+    save_floor(floor, tmp_path / "floor")
+    loaded = load_floor(tmp_path / "floor", chunk_type)
+    assert _dump(loaded) == _dump(floor)
+    assert sorted(chunk.offset for chunk in loaded) == [(0, 0), (1, 2)]
+
+
+@pytest.mark.parametrize('chunk_type', [Chunk, ArrayChunk])
+def test_snapshot_round_trip(tmp_path: Path, chunk_type: type[Chunk]) -> None:
+    floor = _get_floor(chunk_type)
+    assert _dump(load_snapshot(pack_snapshot(floor))) == _dump(floor)
+    save_snapshot(floor, tmp_path / "floor.alfs")
+    loaded = load_floor(tmp_path / "floor.alfs")
+    assert loaded.entity_files == floor.entity_files
+    assert _dump(loaded) == _dump(floor)
+
+
+def test_far_chunks_round_trip() -> None:
+    floor = Floor()
+    offsets = [(0, 0), (40000, -50000), (-(1 << 31), (1 << 31) - 1)]
+    for x, y in offsets:
+        floor.enable_chunk(x, y)
+        floor[x, y][1, 2] = Entity(3, 1)
+    loaded = load_snapshot(pack_snapshot(floor))
+    assert sorted(chunk.offset for chunk in loaded) == sorted(offsets)
+    for chunk in loaded:
+        assert [(position, entity.id) for position, entity in chunk.tiles()] == [((1, 2), 3)]
+
+
+def test_header_counts_past_16_bits() -> None:
+    header = HEADER.unpack(HEADER.pack(MAGIC, VERSION, 1 << 16, 3, 0, 0))
+    assert header[2:4] == (1 << 16, 3)
+
+
+def test_map_closed_once_decoded(tmp_path: Path) -> None:
+    save_snapshot(_get_floor(Chunk), tmp_path / "floor.alfs")
+    snapshot = Snapshot(tmp_path / "floor.alfs")
+    snapshot.read_tiles(0)
+    assert not snapshot._map.closed
+    snapshot.read_tiles(1)
+    assert snapshot._map.closed
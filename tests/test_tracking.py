@@ -0,0 +1,139 @@
+#!/usr/bin/python
+##-------------------------------##
+## Assembly Line: Tests          ##
+## Written By: Ryan Smith        ##
+##-------------------------------##
+## Tracking                      ##
+##-------------------------------##
+
+## Imports
+from __future__ import annotations
+
+import pytest
+
+from editor.chunk import ArrayChunk, Chunk
+from editor.entity import Entity
+from editor.floor import Floor
+from editor.manager import dump_chunk
+from editor.simulator import compile_floor
+from editor.tracking import ChunkDumps, CompiledFloor, EntityCounts
+
+
+## Functions
+@pytest.fixture(params=[Chunk, ArrayChunk])
+def floor(request: pytest.FixtureRequest) -> Floor:
+    """Gets a 3x3 chunk floor of each chunk backend with a clean history"""
+    floor = Floor(request.param)
+    with floor.untracked():
+        for x in range(3):
+            for y in range(3):
+                floor.enable_chunk(x, y)
+    floor.entity_files.update({2: "rollers.json", 3: "sellers.json"})
+    return floor
+
+
+def _ids(floor: Floor, *positions: tuple[int, int]) -> list[int | None]:
+    """Gets the type id at each position (None: empty)"""
+    return [entity.id if entity is not None else None for entity in (floor.get_entity(*p) for p in positions)]
+
+
+def test_undo_redo(floor: Floor) -> None:
+    floor.set_entity(1, 1, Entity(2))
+    floor.set_entity(1, 1, Entity(3))
+    assert floor.undo()
+    assert _ids(floor, (1, 1)) == [2]
+    assert floor.undo()
+    assert _ids(floor, (1, 1)) == [None]
+    assert not floor.undo()
+    assert floor.redo() and floor.redo()
+    assert _ids(floor, (1, 1)) == [3]
+    assert not floor.redo()
+    # -A new write drops what could be redone
+    floor.undo()
+    floor.set_entity(2, 2, Entity(2))
+    assert not floor.redo()
+    assert floor.positions_of_type(3) == frozenset()
+
+
+def test_edit_groups_one_version_and_undo(floor: Floor) -> None:
+    version = floor.version
+    with floor.edit():
+        floor.set_entity(1, 1, Entity(2))
+        with floor.edit():
+            floor.set_entity(25, 1, Entity(2))
+        floor.set_entity(1, 1, Entity(3))
+    assert floor.version == version + 1
+    assert len(floor.changes_since(version)) == 3
+    assert floor.undo()
+    assert _ids(floor, (1, 1), (25, 1)) == [None, None]
+    assert floor.redo()
+    assert _ids(floor, (1, 1), (25, 1)) == [3, 2]
+
+
+def test_changes_since(floor: Floor) -> None:
+    version = floor.version
+    floor.set_entity(1, 1, Entity(2))
+    middle = floor.version
+    floor.set_entity(15, 1, Entity(2))
+    assert floor.changes_since(version) == [(middle, (0, 0), (1, 1)), (floor.version, (1, 0), (15, 1))]
+    assert floor.changes_since(middle) == [(floor.version, (1, 0), (15, 1))]
+    assert floor.changes_since(floor.version) == []
+    assert floor.dirty_chunks(version) == {(0, 0), (1, 0)}
+
+
+def test_affected_chunks_cross_edges_only(floor: Floor) -> None:
+    version = floor.version
+    floor.set_entity(15, 15, Entity(2))  # -Middle of chunk (1, 1)
+    assert floor.affected_chunks(version) == {(1, 1)}
+    version = floor.version
+    floor.set_entity(10, 15, Entity(2))  # -Left edge of chunk (1, 1)
+    assert floor.affected_chunks(version) == {(1, 1), (0, 1)}
+    version = floor.version
+    floor.disable_chunk(1, 1)  # -Whole chunk change reaches every neighbour
+    assert floor.affected_chunks(version) == {(1, 1), (0, 1), (2, 1), (1, 0), (1, 2)}
+
+
+def test_journal_overflow(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(Floor, 'JournalLimit', 4)
+    floor = Floor()
+    floor.enable_chunk(0, 0)
+    version = floor.version
+    for x in range(4):
+        floor.set_entity(x, 0, Entity(2))
+    assert len(floor.changes_since(version)) == 4
+    floor.set_entity(5, 0, Entity(2))
+    assert floor.changes_since(version) is None
+    assert floor.dirty_chunks(version) is None
+    assert floor.affected_chunks(version) is None
+    assert len(floor.changes_since(version + 1)) == 4
+
+
+def test_chunk_caches_follow_edits(floor: Floor, monkeypatch: pytest.MonkeyPatch) -> None:
+    counts = EntityCounts(floor)
+    compiled = CompiledFloor(floor)
+    dumps = ChunkDumps(floor)
+    floor.set_entity(1, 1, Entity(2))
+    floor.set_entity(25, 25, Entity(3))
+    assert counts.counts() == {2: 1, 3: 1}
+    assert compiled.compile() == compile_floor(floor)
+    assert len(dumps.update()) == 9
+    # -Only the edited chunk is recomputed
+    floor.set_entity(1, 2, Entity(2))
+    assert compiled.update() == {(0, 0)}
+    assert dumps.update() == {(0, 0)}
+    assert counts.counts() == {2: 2, 3: 1}
+    assert sorted(zip(*compiled.compile()[::2])) == sorted(zip(*compile_floor(floor)[::2]))
+    assert dumps.values[0, 0] == dump_chunk(floor, floor[0, 0])
+    # -Disabled chunks drop out, undo is picked up like any edit
+    floor.disable_chunk(2, 2)
+    assert counts.counts() == {2: 2}
+    dumps.update()
+    assert (2, 2) not in dumps.values
+    floor.set_entity(1, 2, Entity(3))
+    floor.undo()
+    assert counts.counts() == {2: 2}
+    # -Starting over once the journal no longer reaches back
+    monkeypatch.setattr(floor, 'changes_since', lambda version: None)
+    floor.set_entity(4, 4, Entity(3))
+    assert counts.update() == {chunk.offset for chunk in floor}
+    assert counts.counts() == {2: 2, 3: 1}